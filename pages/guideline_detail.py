@@ -2,41 +2,11 @@
 
 import streamlit as st
 import pandas as pd
-from utils.session_manager import load_csv
+import numpy as np
+from utils.data_processing import get_citation_index
 from utils.helpers import get_judgment_color
-from urllib.parse import urlparse
-import requests
-from PIL import Image
-from io import BytesIO
-
-def is_valid_image_url(url):
-    """Validate if URL is accessible and returns an image"""
-    try:
-        # Check if URL is well-formed
-        result = urlparse(url.strip())
-        if not all([result.scheme, result.netloc]):
-            return False
-            
-        # Try to fetch headers only first
-        response = requests.head(url.strip(), timeout=5)
-        content_type = response.headers.get('content-type', '')
-        return 'image' in content_type.lower()
-    except:
-        return False
-
-def load_and_display_image(url, use_container_width=True, width=None):
-    """Safely load and display an image from URL"""
-    try:
-        response = requests.get(url.strip(), timeout=5)
-        image = Image.open(BytesIO(response.content))
-        if width:
-            st.image(image, width=width)
-        else:
-            st.image(image, use_container_width=use_container_width)
-        return True
-    except Exception as e:
-        st.warning(f"Could not load image: {url}")
-        return False
+from utils.image_service import fetch_images, split_image_urls
+from concurrent.futures import as_completed
 
 
 # def render_guideline_detail(citation_code):
@@ -129,6 +99,80 @@ def load_and_display_image(url, use_container_width=True, width=None):
 #         st.rerun()
 
 
+CITATION = 'Citation Code: Platform-Specific'
+
+
+def open_guideline_detail(df, position, sequence=None, rank=None):
+    """
+    Selects the row at `position` of the session frame for the detail page. `sequence`
+    (row positions in on-screen order) and the row's `rank` in it drive prev/next.
+    """
+    st.session_state.selected_row = int(position)
+    st.session_state.selected_guideline = df[CITATION].iat[position]
+    st.session_state.selected_image_index = 0
+    if sequence is not None:
+        st.session_state.detail_nav = {"sequence": np.asarray(sequence), "rank": rank}
+
+
+def _resolve_row(df, citation_code):
+    """Row position of the guideline to show: the selected row, or the code's first row through the citation index."""
+    position = st.session_state.get("selected_row")
+    if position is not None and 0 <= position < len(df) and df[CITATION].iat[position] == citation_code:
+        return position
+    positions = get_citation_index(df).get(citation_code)
+    if positions is None:
+        return None
+    st.session_state.selected_row = int(positions[0])
+    return st.session_state.selected_row
+
+
+def _navigate(df, step):
+    nav = st.session_state.detail_nav
+    rank = nav["rank"] + step
+    open_guideline_detail(df, nav["sequence"][rank])
+    nav["rank"] = rank
+
+
+def render_navigation(df, position):
+    """Previous/next buttons over the guidelines the user came from, in their on-screen order."""
+    nav = st.session_state.get("detail_nav")
+    if not nav or nav["rank"] is None or nav["sequence"][nav["rank"]] != position:
+        return
+    rank, total = nav["rank"], len(nav["sequence"])
+    prev_col, label_col, next_col = st.columns([1, 4, 1])
+    with prev_col:
+        if st.button("← Previous", disabled=rank == 0, key="detail_prev"):
+            _navigate(df, -1)
+            st.rerun()
+    with label_col:
+        st.caption(f"Guideline {rank + 1:,} of {total:,}")
+    with next_col:
+        if st.button("Next →", disabled=rank >= total - 1, key="detail_next"):
+            _navigate(df, 1)
+            st.rerun()
+
+
+def render_other_case_studies(df, citation_code, position):
+    """Links to the same guideline as reviewed in other case studies."""
+    others = [p for p in get_citation_index(df).get(citation_code, []) if p != position]
+    if not others:
+        return
+    st.markdown('<p class="text"><strong>Also reviewed in:</strong></p>', unsafe_allow_html=True)
+    cols = st.columns(min(4, len(others)))
+    for i, other in enumerate(others):
+        with cols[i % len(cols)]:
+            if st.button(str(df['Case Study Title'].iat[other]), key=f"case_study_{other}"):
+                nav = st.session_state.get("detail_nav")
+                rank = None
+                if nav:
+                    ranks = np.flatnonzero(nav["sequence"] == other)
+                    rank = int(ranks[0]) if len(ranks) else None
+                open_guideline_detail(df, other)
+                if nav:
+                    nav["rank"] = rank
+                st.rerun()
+
+
 def render_guideline_detail(citation_code):
     if not citation_code:
         return
@@ -153,9 +197,16 @@ def render_guideline_detail(citation_code):
         """, unsafe_allow_html=True)
 
     init_styles()
-    df = load_csv(st.session_state.uploaded_file)
-    guideline = df[df['Citation Code: Platform-Specific'] == citation_code].iloc[0]
-    
+    # The row comes from the in-memory session frame, by position (or via the citation index).
+    df = st.session_state.df
+    position = _resolve_row(df, citation_code)
+    if position is None:
+        st.warning(f"Guideline {citation_code} is not in the loaded dataset.")
+        return
+    guideline = df.iloc[position]
+
+    render_navigation(df, position)
+
     col1, col2 = st.columns([6, 4])
     
     with col1:
@@ -163,6 +214,7 @@ def render_guideline_detail(citation_code):
                    unsafe_allow_html=True)
         st.markdown(f'<h1 class="title">{citation_code} - {guideline["Title"]}</h1>', 
                    unsafe_allow_html=True)
+        render_other_case_studies(df, citation_code, position)
         
         st.markdown(f"""
         <div class="card" style="background-color:{get_judgment_color(guideline['Judgement'])}; color:white; text-align:center">
@@ -195,85 +247,77 @@ def render_guideline_detail(citation_code):
         # Initialize session state for selected image if not present
         if 'selected_image_index' not in st.session_state:
             st.session_state.selected_image_index = 0
-            
-        # Handle images with proper validation and error handling
-        if pd.notna(guideline['Image URLs']):
-            # Split the image URLs and ensure they're strings
-            image_urls_raw = guideline['Image URLs']
-            
-            # Handle different formats of Image URLs (string, list, etc.)
-            if isinstance(image_urls_raw, str):
-                # Split by commas if it's a string
-                image_urls = [url.strip() for url in image_urls_raw.split(',') if url.strip()]
-            elif isinstance(image_urls_raw, list):
-                # Already a list, just ensure all items are strings
-                image_urls = [str(url).strip() for url in image_urls_raw if str(url).strip()]
-            else:
-                # Single item that's not a string
-                image_urls = [str(image_urls_raw).strip()] if str(image_urls_raw).strip() else []
-            
-            # Validate each URL
-            valid_image_urls = []
-            invalid_urls = []
-            
-            for url in image_urls:
-                if is_valid_image_url(url):
-                    valid_image_urls.append(url)
+
+        image_urls = split_image_urls(guideline['Image URLs'])
+        if image_urls:
+            # Every image is fetched concurrently; each one is drawn as soon as it arrives.
+            pending = fetch_images(image_urls)
+
+            # If an image is clicked, update the selected index
+            if 'clicked_image' in st.session_state and st.session_state.clicked_image is not None:
+                st.session_state.selected_image_index = st.session_state.clicked_image
+                st.session_state.clicked_image = None  # Reset after use
+
+            # Ensure the index is valid (in case the number of images changed)
+            if st.session_state.selected_image_index >= len(image_urls):
+                st.session_state.selected_image_index = 0
+            selected = st.session_state.selected_image_index
+
+            # Lay out placeholders first so the page renders before any download finishes.
+            issues_slot = st.empty()
+            main_slot = st.empty()
+            main_slot.caption(f"Loading {len(image_urls)} image(s)...")
+
+            thumb_slots = {}
+            if len(image_urls) > 1:
+                st.write("##### All Images:")
+
+                # Determine number of columns based on image count
+                cols_per_row = min(4, len(image_urls))
+                cols = st.columns(cols_per_row)
+
+                for i in range(len(image_urls)):
+                    with cols[i % cols_per_row]:
+                        # Add border to currently selected thumbnail
+                        border = "3px solid #4b8bf4" if i == selected else "1px solid gray"
+                        st.markdown(f'<div style="border:{border}; padding:2px;">', unsafe_allow_html=True)
+
+                        if st.button(f"Image {i+1}", key=f"thumb_{i}"):
+                            st.session_state.selected_image_index = i
+                            st.rerun()
+
+                        thumb_slots[i] = st.empty()
+                        st.markdown('</div>', unsafe_allow_html=True)
+
+            results = [None] * len(image_urls)
+            main_shown = False
+            for future in as_completed(pending):
+                i = pending[future]
+                result = results[i] = future.result()
+                if i in thumb_slots:
+                    if result.ok:
+                        thumb_slots[i].image(result.thumbnail_path, width=60)
+                    else:
+                        thumb_slots[i].write("❌")
+                if i == selected and result.ok:
+                    main_slot.image(result.path, use_container_width=True)
+                    main_shown = True
+
+            valid_results = [result for result in results if result.ok]
+            if not main_shown:
+                # The selected image failed: fall back to the first one that loaded.
+                if valid_results:
+                    main_slot.image(valid_results[0].path, use_container_width=True)
                 else:
-                    invalid_urls.append(url)
-            
+                    main_slot.info("No valid images available for this guideline.")
+
             # Only show invalid URL warnings in an expander to keep the UI clean
-            if invalid_urls:
-                with st.expander("Image Loading Issues"):
-                    for url in invalid_urls:
-                        st.warning(f"Could not load image: {url[:50]}...")
-            
-            # Display the images if we have valid URLs
-            if valid_image_urls:
-                # If an image is clicked, update the selected index
-                if 'clicked_image' in st.session_state and st.session_state.clicked_image is not None:
-                    st.session_state.selected_image_index = st.session_state.clicked_image
-                    st.session_state.clicked_image = None  # Reset after use
-                
-                # Ensure the index is valid (in case the number of images changed)
-                if st.session_state.selected_image_index >= len(valid_image_urls):
-                    st.session_state.selected_image_index = 0
-                
-                # Display the main image (selected one)
-                main_image_url = valid_image_urls[st.session_state.selected_image_index]
-                load_and_display_image(main_image_url)
-                
-                # Display thumbnails of all images
-                if len(valid_image_urls) > 1:
-                    st.write("##### All Images:")
-                    
-                    # Determine number of columns based on image count
-                    cols_per_row = min(4, len(valid_image_urls))
-                    cols = st.columns(cols_per_row)
-                    
-                    # Display thumbnails with highlight for selected one
-                    for i, url in enumerate(valid_image_urls):
-                        with cols[i % cols_per_row]:
-                            # Add border to currently selected thumbnail
-                            border = "3px solid #4b8bf4" if i == st.session_state.selected_image_index else "1px solid gray"
-                            st.markdown(f'<div style="border:{border}; padding:2px;">', unsafe_allow_html=True)
-                            
-                            # We'll use a button with an image inside for each thumbnail
-                            if st.button(f"Image {i+1}", key=f"thumb_{i}"):
-                                st.session_state.selected_image_index = i
-                                st.rerun()
-                                
-                            # Show a small preview
-                            try:
-                                response = requests.get(url.strip(), timeout=3)
-                                img = Image.open(BytesIO(response.content))
-                                st.image(img, width=60)
-                            except:
-                                st.write("❌")
-                                
-                            st.markdown('</div>', unsafe_allow_html=True)
-            else:
-                st.info("No valid images available for this guideline.")
+            invalid_results = [result for result in results if not result.ok]
+            if invalid_results:
+                with issues_slot.container():
+                    with st.expander("Image Loading Issues"):
+                        for result in invalid_results:
+                            st.warning(f"Could not load image: {result.url[:50]}...")
 
         st.markdown('<div class="section-gap"></div>', unsafe_allow_html=True)
         with st.expander("Additional Information", expanded=True):
@@ -6,10 +6,21 @@ import numpy as np
 import os
 from streamlit_plotly_events import plotly_events
 
-from utils.session_manager import save_uploaded_file, load_csv, validate_csv
-from utils.data_processing import compute_overall_statistics, apply_chart_filters
+from utils.session_manager import (
+    save_uploaded_file, load_csv, validate_csv, ingest_csv_streaming, compute_file_hash,
+    STREAMING_THRESHOLD_BYTES, CHUNK_SIZE
+)
+from utils.data_processing import (
+    compute_overall_statistics, apply_chart_filters, get_filter_index, get_citation_index
+)
+from utils.search_index import get_search_index
+from utils.image_prefetch import get_prefetcher
 
-from utils.tab1_qa_game.visualizations import create_pills_visualization
+from utils.tab1_qa_game.visualizations import create_overview_figure
+from utils.tab1_qa_game.overview_cache import FilterResultCache, normalize_filters
+from utils.tab1_qa_game.table import (
+    build_display_table, citation_group_parity, style_judgement_table, page_bounds, PAGE_SIZE
+)
 from utils.tab2_downloads.downloads import display_download_options
 from utils.tab4_presentation.presentation import presentation_tab_4
 
@@ -35,6 +46,44 @@ if 'df' not in st.session_state:
     st.session_state.df = None
 if 'selected_guideline' not in st.session_state:
     st.session_state.selected_guideline = None
+if 'selected_row' not in st.session_state:
+    st.session_state.selected_row = None
+if 'detail_nav' not in st.session_state:
+    st.session_state.detail_nav = None
+if 'dataset_hash' not in st.session_state:
+    st.session_state.dataset_hash = None
+if 'overview_cache' not in st.session_state:
+    st.session_state.overview_cache = FilterResultCache()
+if 'pills_drilldown' not in st.session_state:
+    st.session_state.pills_drilldown = None
+
+
+def load_uploaded_csv(file_path):
+    """Loads an upload, streaming it in chunks (with a progress bar) when it is very large."""
+    if os.path.getsize(file_path) < STREAMING_THRESHOLD_BYTES:
+        return load_csv(file_path)
+
+    progress_bar = st.progress(0.0, text="Ingesting CSV...")
+    last_progress = {}
+
+    def report_progress(progress):
+        last_progress.update(progress)
+        text = (f"Ingesting CSV... {progress['rows_read']:,} rows read "
+                f"({progress['rows_per_second']:,.0f} rows/s, {progress['rows_kept']:,} kept, "
+                f"{progress['citation_matches']:,} platform citations)")
+        if progress["invalid_chunks"]:
+            text += f" ⚠️ {progress['invalid_chunks']} chunk(s) without valid citations"
+        progress_bar.progress(progress["fraction"], text=text)
+
+    df = ingest_csv_streaming(file_path, progress_callback=report_progress)
+    progress_bar.empty()
+    if last_progress.get("invalid_chunks") and last_progress.get("citation_matches"):
+        st.warning(
+            f"{last_progress['invalid_chunks']} chunk(s) of {CHUNK_SIZE:,} rows had no valid platform identifiers "
+            "in 'Citation Code: Platform-Specific' (expected #289D, #289M or #289A)."
+        )
+    return df
+
 
 def main():
     if st.session_state.selected_guideline:
@@ -54,10 +103,16 @@ def main():
             uploaded_file = st.file_uploader("Choose a CSV file", type=['csv'])
             if uploaded_file:
                 file_path = save_uploaded_file(uploaded_file)
-                df = load_csv(file_path)
+                df = load_uploaded_csv(file_path)
                 if validate_csv(df):
+                    # Build the per-dataset indexes up front so the first filter/search is already fast.
+                    get_filter_index(df)
+                    get_search_index(df)
+                    get_citation_index(df)
                     st.session_state.uploaded_file = file_path
                     st.session_state.df = df
+                    st.session_state.dataset_hash = compute_file_hash(file_path)
+                    st.session_state.overview_cache.invalidate()
                     st.rerun()
                 else:
                     st.error("Uploaded CSV is missing required columns or contains invalid data.")
@@ -161,8 +216,7 @@ def main():
                 sort_by_impact = st.checkbox("High to Low Impact")
 
 
-            filtered_df = apply_chart_filters(
-                df,
+            filters = dict(
                 search_term=search_term,
                 theme_filter=theme_filter,
                 case_study_filter=case_study_filter,
@@ -171,13 +225,45 @@ def main():
                 sort_by_impact=sort_by_impact
             )
 
+            # A clicked tile (level-of-detail mode) narrows the chart to one case study x theme;
+            # it only applies while the filters it was clicked under are unchanged.
+            base_key = normalize_filters(**filters)
+            drilldown = st.session_state.pills_drilldown
+            if drilldown is not None and drilldown["filters"] != base_key:
+                drilldown = st.session_state.pills_drilldown = None
+            if drilldown is not None:
+                filters.update(case_study_filter=drilldown["case_study"], theme_filter=drilldown["theme"])
+
+            def compute_overview():
+                filtered = apply_chart_filters(df, **filters)
+                return (filtered,) + create_overview_figure(filtered, allow_tiles=drilldown is None)
+
+            # Reruns with the same dataset and filters reuse the filtered frame and figure.
+            filter_key = normalize_filters(**filters) + (drilldown is not None,)
+            filtered_df, fig, tiles, pill_rows = st.session_state.overview_cache.get_or_compute(
+                st.session_state.dataset_hash,
+                filter_key,
+                compute_overview
+            )
+
+            # Warm the screenshot cache for these guidelines so detail pages open with images local.
+            get_prefetcher().schedule((st.session_state.dataset_hash, filter_key), filtered_df)
+
             st.markdown("######")        
 
 
             # 
             # Visualization Section.
             #
-            fig = create_pills_visualization(filtered_df, title="")
+            if tiles is not None:
+                st.caption(f"{len(filtered_df):,} guidelines, grouped by case study and theme. Click a tile to see its guidelines.")
+            elif drilldown is not None:
+                st.caption(f"Showing {drilldown['case_study']} × {drilldown['theme']}")
+                if st.button("← Back to all case studies and themes"):
+                    st.session_state.pills_drilldown = None
+                    st.rerun()
+            if pill_rows is not None and len(pill_rows) < filtered_df['Judgement'].notna().sum():
+                st.caption(f"Showing the first {len(pill_rows):,} guidelines. Narrow the filters to see the rest.")
 
             selected_points = plotly_events(fig, click_event=True)
 
@@ -186,8 +272,18 @@ def main():
                 if point_index is None:
                     point_index = selected_points[0].get('pointNumber', None)
                 if point_index is not None:
-                    clicked_citation = filtered_df.iloc[point_index]['Citation Code: Platform-Specific']
-                    st.session_state.selected_guideline = clicked_citation
+                    if tiles is not None:
+                        tile = tiles.iloc[point_index]
+                        st.session_state.pills_drilldown = {
+                            "filters": base_key,
+                            "case_study": tile['Case Study Title'],
+                            "theme": tile['Catalog Theme Title'],
+                        }
+                    else:
+                        # pill_rows keeps the session frame's index, i.e. row positions; they
+                        # also give the detail page its prev/next order.
+                        from pages.guideline_detail import open_guideline_detail
+                        open_guideline_detail(df, pill_rows.index[point_index], pill_rows.index.to_numpy(), point_index)
                     st.rerun()
 
 
@@ -199,66 +295,22 @@ def main():
             #  
 
             if not filtered_df.empty:
-                display_df = filtered_df.sort_values(['Citation Code: Platform-Specific'])
-                
                 # Create a display dataframe with the columns we want to show
-                display_df = display_df[[
-                    'Citation Code: Platform-Specific',
-                    'Case Study Title',
-                    'Title',
-                    'Judgement',
-                    'Gemini URL',
-                    'Image URLs'
-                ]].rename(columns={
-                    'Citation Code: Platform-Specific': 'Citation',
-                    'Case Study Title': 'Site',
-                    'Title': 'Title'
-                })
-                
-                # Create a mapping of each unique citation to an alternating style
-                unique_citations = display_df['Citation'].unique()
-                citation_style_map = {citation: i % 2 for i, citation in enumerate(unique_citations)}
-                
-                # Define styling function
-                def style_rows(row):
-                    # Get the citation for this row
-                    citation = row['Citation']
-                    
-                    # Determine if this is an even or odd group
-                    group_num = citation_style_map.get(citation, 0)
-                    
-                    # Apply row styling based on group number
-                    if group_num == 0:
-                        bg_color = '#1e1f24'  # Darker background for even groups
-                    else:
-                        bg_color = '#2c2d33'  # Lighter background for odd groups
-                    
-                    # Create styles for each column
-                    styles = ['background-color: ' + bg_color] * len(row)
-                    
-                    # Override style for judgment column
-                    judgment = row['Judgement']
-                    judgment_str = str(judgment).lower().strip() if not pd.isna(judgment) else 'not_rated'
-                    color_map = {
-                        'adhered_high': '#769b37',
-                        'adhered_low': '#a1b145',
-                        'violated_high': '#b42625',
-                        'violated_low': '#ea7a0d',
-                        'not_applicable': '#9c9c9c',
-                        'neutral': '#ffc302',
-                        'issue_resolved': '#0273ff',
-                        'not_rated': 'rgba(255,255,255,0.3)'
-                    }
-                    judgment_color = color_map.get(judgment_str, '#FFFFFF')
-                    
-                    # Find judgment column index
-                    judgment_idx = list(row.index).index('Judgement')
-                    styles[judgment_idx] = f'background-color: {judgment_color}; color: white; font-weight: bold'
-                    
-                    return styles
-                
+                display_df = build_display_table(filtered_df)
+                parity = citation_group_parity(display_df['Citation'])
+
+                # Large result sets are styled and rendered one page at a time.
+                num_pages = (len(display_df) + PAGE_SIZE - 1) // PAGE_SIZE
+                if num_pages > 1:
+                    page = st.number_input(
+                        f"Page (of {num_pages:,}, {PAGE_SIZE} rows each)",
+                        min_value=1, max_value=num_pages, value=1, step=1
+                    )
+                    start, stop = page_bounds(len(display_df), page)
+                    display_df, parity = display_df.iloc[start:stop], parity[start:stop]
+
                 # Apply styling
-                styled_df = display_df.style.apply(style_rows, axis=1)
+                styled_df = style_judgement_table(display_df, parity)
                 
                 # Display the styled dataframe
                 st.dataframe(
@@ -0,0 +1,128 @@
+# utils/agent/conversation.py
+
+import hashlib
+import json
+
+from utils.agent.result_encoder import estimate_tokens
+from utils.agent.tools import result_id_for
+
+# Upper bound on the estimated tokens of the history sent before the new prompt.
+HISTORY_TOKEN_BUDGET = 4000
+# The most recent turns are replayed verbatim (with their tool calls and results) while they fit.
+RECENT_TURNS = 2
+# Older answers are cut to this many characters in their summaries.
+SUMMARY_ANSWER_CHARS = 300
+# Turns kept in the session; older ones would never fit the budget anyway.
+MAX_STORED_TURNS = 50
+
+
+def make_turn(prompt: str, answer: str, tool_calls: list = None, tool_messages: list = None,
+              routed: tuple = None) -> dict:
+    """
+    One finished exchange, as stored in st.session_state.chat_turns. `answer` is the full
+    reply shown to the user (any text streamed before the tool calls included).
+    """
+    return {
+        "prompt": prompt,
+        "answer": answer,
+        "tool_calls": tool_calls or [],
+        "tool_messages": tool_messages or [],
+        "routed": list(routed) if routed else None
+    }
+
+
+def append_turn(turns: list, turn: dict) -> None:
+    turns.append(turn)
+    del turns[:-MAX_STORED_TURNS]
+
+
+def verbatim_messages(turn: dict) -> list:
+    """The turn as originally exchanged: prompt, tool calls with their results, answer."""
+    messages = [{"role": "user", "content": turn["prompt"]}]
+    if turn["tool_calls"]:
+        messages.append({"role": "assistant", "content": None, "tool_calls": turn["tool_calls"]})
+        messages.extend(turn["tool_messages"])
+    messages.append({"role": "assistant", "content": turn["answer"]})
+    return messages
+
+
+def _tool_summary(name: str, arguments: dict, content: str = None) -> str:
+    line = f"{name}({json.dumps(arguments, sort_keys=True)})"
+    try:
+        payload = json.loads(content) if content else None
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict) and "total_rows" in payload:
+        line += f" -> {payload['total_rows']} rows, result_id {payload.get('result_id', result_id_for(name, arguments))}"
+    return line
+
+
+def compact_messages(turn: dict) -> list:
+    """
+    The turn condensed to the question and a short summary of the answer and of the
+    tools used. Result ids stay in the summary so the model can page an old result
+    with fetch_more_rows instead of calling the tool again.
+    """
+    answer = turn["answer"] or ""
+    if len(answer) > SUMMARY_ANSWER_CHARS:
+        answer = answer[:SUMMARY_ANSWER_CHARS].rstrip() + "…"
+    contents = {message["tool_call_id"]: message["content"] for message in turn["tool_messages"]}
+    tools_used = []
+    for call in turn["tool_calls"]:
+        try:
+            arguments = json.loads(call["function"]["arguments"] or "{}")
+        except ValueError:
+            arguments = {}
+        tools_used.append(_tool_summary(call["function"]["name"], arguments, contents.get(call["id"])))
+    if turn["routed"]:
+        tools_used.append(_tool_summary(*turn["routed"]))
+
+    summary = f"(Earlier answer, condensed) {answer}"
+    if tools_used:
+        summary += "\nTools used: " + "; ".join(tools_used)
+    return [{"role": "user", "content": turn["prompt"]}, {"role": "assistant", "content": summary}]
+
+
+def message_tokens(messages: list) -> int:
+    return sum(estimate_tokens(json.dumps(message, default=str)) for message in messages)
+
+
+def build_history(turns: list, budget: int = HISTORY_TOKEN_BUDGET) -> list:
+    """
+    Messages replaying the conversation so far within `budget` tokens: the last
+    RECENT_TURNS verbatim, older turns as summaries, newest first until the budget
+    is spent (a recent turn that does not fit verbatim is summarized instead).
+    """
+    history = []
+    used = 0
+    for age, turn in enumerate(reversed(turns)):
+        messages = verbatim_messages(turn) if age < RECENT_TURNS else compact_messages(turn)
+        cost = message_tokens(messages)
+        if used + cost > budget and age < RECENT_TURNS:
+            messages = compact_messages(turn)
+            cost = message_tokens(messages)
+        if used + cost > budget:
+            break
+        history[:0] = messages
+        used += cost
+    return history
+
+
+def history_key(history: list) -> str:
+    """Fingerprint of the replayed history, so cached answers are only reused in the same context."""
+    if not history:
+        return ""
+    return hashlib.sha256(json.dumps(history, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def results_in_window(history: list) -> dict:
+    """result_id -> tool_call_id of every tool result replayed verbatim in the history."""
+    results = {}
+    for message in history:
+        for call in message.get("tool_calls") or []:
+            try:
+                arguments = json.loads(call["function"]["arguments"] or "{}")
+            except ValueError:
+                continue
+            results[result_id_for(call["function"]["name"], arguments)] = call["id"]
+    return results
@@ -0,0 +1,266 @@
+# utils/agent/intent_router.py
+
+import difflib
+import re
+
+import pandas as pd
+
+from utils.agent.response_cache import normalize_prompt
+from utils.agent.tool_view import get_tool_view
+from utils.agent.tools import execute_tool
+
+# Minimum similarity for a fuzzy (misspelled) theme / topic / case study mention.
+FUZZY_CUTOFF = 0.85
+# Shorter names must be mentioned exactly ("Theme 4" is one typo away from "Theme 5").
+FUZZY_MIN_LENGTH = 8
+# Rows shown in a locally rendered answer table.
+ANSWER_TABLE_ROWS = 20
+
+# Questions asking for explanation or judgement always go to the model.
+OPEN_ENDED = re.compile(
+    r"\b(why|how come|explain|reason|recommend|suggest|should|advice|advise|improve|summari[sz]e|insight|"
+    r"what do you think|opinion|interpret|meaning|help me)\b"
+)
+PLATFORM_WORDS = re.compile(r"\b(desktop|mobile|app)s?\b")
+# Follow-ups that lean on an earlier answer ("how many of those are mobile?", "and on desktop?").
+REFERS_BACK = re.compile(
+    r"\b(?:those|them|these|that|this|it|its|they|their|same|above|previous|earlier|former|latter)\b"
+    r"|^(?:and|or|but|also|only|now|then|so|what about|how about)\b"
+)
+ASCENDING_WORDS = re.compile(r"\b(lowest|worst|bottom|least|ascending|poorest|weakest)\b")
+
+COMPARE = re.compile(r"^compare (?:the )?(?P<title>.+?) (?:across|between|among) (?:all )?(?:the )?(?:sites|case studies)(?P<rest>.*)$")
+SITE_ADHERENCE = re.compile(r"^(?:which|what) (?:sites?|case stud(?:y|ies))\b.*\b(?P<status>violat|adher)")
+RANK = re.compile(r"^(?:rank|ranking|order|sort|which case stud(?:y|ies)|which sites?|top|best|worst)\b.*\b(?:impact|perform)")
+# Count questions are matched in full: any other qualifier ("in Checkout", "per site", ...) goes to the model.
+STATS = re.compile(
+    r"^(?:how many|number of|count of|count|total)(?: number of)?(?: (?:desktop|mobile|app))? guidelines?"
+    r"(?: (?:are there|do we have|exist|are in the dataset|in the dataset|in total|overall|altogether|total))?"
+    r"(?: (?:for|on) (?:the )?(?:desktop|mobile|app))?$"
+)
+DATASET_INFO = re.compile(
+    r"^(?:what|which|list|show)(?: me)?(?: are| is)?(?: the| all)?(?: available)? "
+    r"(?P<what>themes|topics|case studies|sites|platforms)"
+    r"(?: (?:are there|are available|do we have|exist|are in the dataset|in the dataset))?$"
+)
+THEME = re.compile(r"\b(?:guidelines? (?:in|for|under|within|of)|show (?:me )?(?:the )?theme)\b")
+SEARCH = re.compile(
+    r"^(?:search|find|look up|lookup)(?: for)?(?: (?:a |the )?guidelines?)?(?: (?:about|on|for|with|matching|titled|named))?"
+    r"\s+(?P<term>.+)$"
+)
+
+CRITERIA_FLAGS = {
+    "violated": re.compile(r"\bviolat"),
+    "adhered": re.compile(r"\badher"),
+    "low_cost": re.compile(r"\b(?:low[- ]cost|cheap|inexpensive)\b"),
+    "high_impact": re.compile(r"\bhigh[- ]impact\b"),
+    "na": re.compile(r"\b(?:n/a|not applicable)\b"),
+}
+
+
+def match_name(text: str, names: list):
+    """
+    The name mentioned in the text: an exact (case-insensitive) mention, otherwise the
+    closest run of words with at least FUZZY_CUTOFF similarity. Longer exact names win.
+    """
+    words = text.split()
+    best, best_score = None, 0.0
+    for name in names:
+        key = name.casefold()
+        if re.search(rf"\b{re.escape(key)}\b", text):
+            score = 1.0 + len(key) / 1000
+        elif len(key) < FUZZY_MIN_LENGTH:
+            continue
+        else:
+            size = len(key.split())
+            windows = (" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 0)))
+            score = max((difflib.SequenceMatcher(None, key, window).ratio() for window in windows), default=0.0)
+            if score < FUZZY_CUTOFF:
+                continue
+        if score > best_score:
+            best, best_score = name, score
+    return best
+
+
+def _platform(text: str):
+    match = PLATFORM_WORDS.search(text)
+    return match.group(1) if match else None
+
+
+def _flags(text: str) -> dict:
+    return {flag: True for flag, pattern in CRITERIA_FLAGS.items() if pattern.search(text)}
+
+
+def _scope(text: str, info: dict) -> dict:
+    """The theme, topic, case study and platform the text names (None where it names none)."""
+    return {
+        "theme": match_name(text, info["themes"]),
+        "topic": match_name(text, info["topics"]),
+        "case_study": match_name(text, info["case_studies"]),
+        "platform": _platform(text),
+    }
+
+
+def _unsupported(scope: dict, supported: tuple) -> bool:
+    """True when the question is narrowed by something the chosen tool has no argument for."""
+    return any(value for key, value in scope.items() if key not in supported)
+
+
+def route(df: pd.DataFrame, prompt: str, turns: list = None):
+    """
+    Maps a prompt to (tool name, arguments) with keyword rules and fuzzy name matching,
+    or returns None (ask the model) when the question is open-ended, no rule applies, or
+    the question is narrowed by a theme, topic, case study, platform or criterion the
+    tool's arguments cannot express: a routed answer is exactly the one asked for.
+
+    `turns` are the earlier exchanges of the conversation; a prompt that refers back
+    to them is left to the model, which sees the history.
+    """
+    text = normalize_prompt(prompt)
+    if not text or OPEN_ENDED.search(text):
+        return None
+    if turns and REFERS_BACK.search(text):
+        return None
+    info = execute_tool(df, "get_dataset_info", {})
+
+    match = COMPARE.match(text)
+    if match:
+        rest = match.group("rest")
+        if _flags(rest) or _unsupported(_scope(rest, info), ("platform",)):
+            return None
+        title = match.group("title").strip(" '\"")
+        # "compare guideline X ..." names the guideline X, unless a title really starts with "guideline"
+        if title.startswith("guideline ") and title not in get_tool_view(df).title:
+            title = title[len("guideline "):].strip(" '\"")
+        arguments = {"guideline_id": title}
+        if _platform(rest):
+            arguments["platform"] = _platform(rest)
+        return "compare_guideline_across_sites", arguments
+
+    flags = _flags(text)
+    scope = _scope(text, info)
+
+    match = SITE_ADHERENCE.match(text)
+    if match:
+        if ("violated" in flags and "adhered" in flags) or "na" in flags or _unsupported(scope, ("platform",)):
+            return None
+        arguments = {"status": "violated" if match.group("status") == "violat" else "adhered"}
+        if scope["platform"]:
+            arguments["platform"] = scope["platform"]
+        for flag in ("low_cost", "high_impact"):
+            if flag in flags:
+                arguments[flag] = True
+        return "analyze_site_adherence", arguments
+
+    if RANK.match(text):
+        # The ranking tool only groups and sorts; it cannot filter by anything.
+        if flags or _unsupported(scope, ()):
+            return None
+        group_by = ["Case Study Title"]
+        for word, column in (("theme", "Catalog Theme Title"), ("topic", "Catalog Topic Title"), ("platform", "platform")):
+            if re.search(rf"\b(?:by|per|for each|across) {word}s?\b", text):
+                group_by.append(column)
+        arguments = {"ascending": bool(ASCENDING_WORDS.search(text))}
+        if len(group_by) > 1:
+            arguments["group_by"] = group_by
+        return "rank_case_studies_by_impact", arguments
+
+    if STATS.match(text):
+        return "compute_overall_statistics", {}
+
+    if DATASET_INFO.match(text):
+        return "get_dataset_info", {}
+
+    if re.search(r"\b(?:theme|topic)s?\b", text) and not (scope["theme"] or scope["topic"]):
+        return None  # names a theme or topic we cannot place; let the model work it out
+    if flags and "guideline" in text:
+        if ("violated" in flags and "adhered" in flags) or _unsupported(scope, ("theme", "topic", "platform")):
+            return None
+        arguments = dict(flags)
+        for key in ("theme", "topic", "platform"):
+            if scope[key]:
+                arguments[key] = scope[key]
+        return "analyze_guidelines_by_criteria", arguments
+
+    if scope["theme"] and THEME.search(text):
+        if _unsupported(scope, ("theme", "topic")):
+            return None
+        arguments = {"theme": scope["theme"]}
+        if scope["topic"]:
+            arguments["topic"] = scope["topic"]
+        return "get_theme_guidelines", arguments
+
+    match = SEARCH.match(text)
+    if match:
+        # Theme and topic names are fine here: the search term is matched against them.
+        if flags or _unsupported(scope, ("theme", "topic")):
+            return None
+        return "search_guideline", {"search_term": match.group("term").strip(" '\"")}
+
+    return None
+
+
+def markdown_table(frame: pd.DataFrame, max_rows: int = ANSWER_TABLE_ROWS) -> str:
+    """A GitHub-style markdown table of the first rows (chat messages are re-rendered with st.markdown)."""
+    def cell(value):
+        if isinstance(value, float):
+            value = "" if pd.isna(value) else f"{value:.3g}"
+        return str(value).replace("|", "\\|").replace("\n", " ")
+
+    lines = [
+        "| " + " | ".join(cell(col) for col in frame.columns) + " |",
+        "|" + "---|" * len(frame.columns),
+    ]
+    for row in frame.head(max_rows).itertuples(index=False):
+        lines.append("| " + " | ".join(cell(value) for value in row) + " |")
+    if len(frame) > max_rows:
+        lines.append(f"\n_Showing {max_rows} of {len(frame):,} rows._")
+    return "\n".join(lines)
+
+
+def _describe(arguments: dict) -> str:
+    parts = [key.replace("_", " ") if value is True else f"{key.replace('_', ' ')} '{value}'"
+             for key, value in arguments.items() if value not in (None, False)]
+    return ", ".join(parts)
+
+
+def format_answer(df: pd.DataFrame, prompt: str, function_name: str, arguments: dict, result) -> str:
+    """Renders a routed tool result as the assistant's markdown answer."""
+    text = normalize_prompt(prompt)
+    if isinstance(result, pd.DataFrame) and "Error" in result.columns:
+        return str(result["Error"].iloc[0])
+
+    if function_name == "compute_overall_statistics":
+        stats = result.iloc[0]
+        platform = _platform(text)
+        if platform:
+            name = platform.capitalize()
+            return f"There are **{int(stats[name]):,}** {name} guidelines (of {int(stats['Total Guidelines']):,} in total)."
+        return (f"There are **{int(stats['Total Guidelines']):,}** guidelines: {int(stats['Desktop']):,} Desktop, "
+                f"{int(stats['Mobile']):,} Mobile and {int(stats['App']):,} App.")
+
+    if function_name == "get_dataset_info":
+        what = DATASET_INFO.match(text).group("what")
+        key = {"sites": "case_studies", "case studies": "case_studies"}.get(what, what)
+        values = sorted(result[key], key=str)
+        return f"**{len(values)} {what}:** " + ", ".join(values)
+
+    if function_name == "analyze_guidelines_by_criteria":
+        heading = f"Found **{len(result):,}** guidelines ({_describe(arguments)})."
+    elif function_name == "search_guideline":
+        heading = f"Found **{len(result):,}** guidelines matching '{arguments['search_term']}'."
+    elif function_name == "get_theme_guidelines":
+        heading = f"**{len(result):,}** guidelines in {_describe(arguments)}."
+    elif function_name == "compare_guideline_across_sites":
+        heading = f"'{arguments['guideline_id']}' across **{result['Case Study Title'].nunique()}** sites:"
+    elif function_name == "analyze_site_adherence":
+        heading = f"Guidelines per site ({_describe(arguments)}), most first:"
+    elif function_name == "rank_case_studies_by_impact":
+        order = "lowest" if arguments.get("ascending") else "highest"
+        heading = f"Case studies ranked by average impact, {order} first:"
+    else:
+        heading = f"**{len(result):,}** results ({_describe(arguments)})."
+    if result.empty:
+        return heading
+    return heading + "\n\n" + markdown_table(result)
+
@@ -0,0 +1,111 @@
+# utils/agent/response_cache.py
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.agent.tool_schema import tools
+
+RESPONSE_CACHE_PATH = "chat_cache.sqlite3"
+# Cached answers older than this are treated as missing and recomputed.
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+# Least recently used entries beyond this count are evicted.
+RESPONSE_CACHE_MAX_ENTRIES = 5_000
+
+# Changes whenever a tool's name, description or parameters change, so answers produced
+# with an older tool set are never served.
+TOOL_SCHEMA_VERSION = hashlib.sha256(json.dumps(tools, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, surrounding/repeated whitespace and trailing punctuation do not change the question."""
+    return re.sub(r"\s+", " ", prompt.casefold()).strip().rstrip("?.! ")
+
+
+def response_cache_key(kind: str, prompt: str, dataset_hash: str, model: str, context: str = "") -> str:
+    """
+    Key of a cached step ('tool_selection' or 'answer') for this prompt, dataset, model and
+    tool schema. `context` fingerprints the conversation history sent along with the prompt.
+    """
+    parts = [kind, model, TOOL_SCHEMA_VERSION, dataset_hash, context, normalize_prompt(prompt)]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent (SQLite) cache of chat steps, with a TTL and LRU eviction.
+
+    Values are stored as JSON. A short-lived connection is opened per operation,
+    so the cache can be used from any thread or Streamlit session.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @contextmanager
+    def _transaction(self):
+        db = sqlite3.connect(self.path, timeout=5)
+        try:
+            with db:  # commits on success, rolls back on error
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key: str):
+        """The cached value, or None when missing or older than the TTL."""
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            row = db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value) -> None:
+        """Stores (or replaces) a value, then evicts expired and least recently used entries."""
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._transaction() as db:
+            db.execute("DELETE FROM responses")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """The shared response cache, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,144 @@
+# utils/agent/result_encoder.py
+
+import json
+import math
+
+import pandas as pd
+
+from utils.agent.tool_view import get_tool_view
+from utils.agent.tools import PAGE_ROWS, execute_tool, result_id_for
+
+# Rows sent to the model per result before it has to page with fetch_more_rows.
+MAX_ROWS = PAGE_ROWS
+# Upper bound on the estimated tokens of one encoded tool result.
+TOKEN_BUDGET = 1500
+# Longer cell texts are cut to this many characters.
+MAX_CELL_CHARS = 120
+# Lists inside dict results (e.g. get_dataset_info) are cut to this many items.
+MAX_LIST_ITEMS = 50
+# Columns with at most this many distinct values get value counts in the summary.
+SUMMARY_TOP_VALUES = 5
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text and CSV)."""
+    return math.ceil(len(text) / 4)
+
+
+def _prune_columns(frame: pd.DataFrame):
+    """Drops columns that are empty or hold one value throughout; the latter are reported once as constants."""
+    constants = {}
+    keep = []
+    for col in frame.columns:
+        values = frame[col].dropna()
+        if values.empty:
+            continue
+        if len(frame) > 1 and values.nunique() == 1 and len(values) == len(frame):
+            constants[col] = values.iloc[0]
+        else:
+            keep.append(col)
+    return frame[keep], constants
+
+
+def _summarize(frame: pd.DataFrame) -> dict:
+    """Aggregates over the full result: min/mean/max of numeric columns, top values of low-cardinality ones."""
+    summary = {}
+    for col in frame.columns:
+        series = frame[col]
+        if pd.api.types.is_bool_dtype(series.dtype):
+            summary[col] = {"true": int(series.sum())}
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            values = series.dropna()
+            if not values.empty:
+                summary[col] = {
+                    "min": float(values.min()), "mean": round(float(values.mean()), 3), "max": float(values.max())
+                }
+        else:
+            counts = series.value_counts(dropna=False)
+            if len(counts) <= max(SUMMARY_TOP_VALUES, len(frame) // 10):
+                summary[col] = {str(value): int(count) for value, count in counts.head(SUMMARY_TOP_VALUES).items()}
+    return summary
+
+
+def _to_csv(frame: pd.DataFrame) -> str:
+    text = frame.copy()
+    for col in text.columns[text.dtypes == object]:
+        text[col] = text[col].map(
+            lambda value: value[:MAX_CELL_CHARS] + "…" if isinstance(value, str) and len(value) > MAX_CELL_CHARS else value
+        )
+    return text.to_csv(index=False, float_format="%.4g")
+
+
+def encode_frame(frame: pd.DataFrame, result_id: str = None, offset: int = 0, total_rows: int = None,
+                 max_rows: int = MAX_ROWS, token_budget: int = TOKEN_BUDGET, source: pd.DataFrame = None) -> str:
+    """
+    Compact JSON view of a result frame for the model: totals, constant columns,
+    aggregates over the full result and the first rows as CSV. Rows are halved until
+    the payload fits token_budget; the rest stays local and is reachable by paging.
+    When `frame` is a page, `source` is the whole result it was cut from.
+    """
+    if "Error" in frame.columns:
+        return json.dumps({"error": frame["Error"].iloc[0]}, default=str)
+    whole = frame if source is None else source
+    total_rows = len(whole) if total_rows is None else total_rows
+    pruned, constants = _prune_columns(frame)
+    payload = {"total_rows": total_rows, "offset": offset}
+    if result_id is not None:
+        payload["result_id"] = result_id
+    if constants:
+        payload["same_in_all_rows"] = constants
+    if len(whole) > max_rows:
+        payload["summary"] = _summarize(_prune_columns(whole)[0] if source is not None else pruned)
+
+    rows = min(max_rows, len(pruned))
+    while True:
+        payload["rows_csv"] = _to_csv(pruned.iloc[:rows])
+        payload["returned_rows"] = rows
+        shown = offset + rows
+        if shown < total_rows and result_id is not None:
+            payload["more"] = (
+                f"{total_rows - shown} more rows: call fetch_more_rows with result_id "
+                f"'{result_id}' and offset {shown}."
+            )
+        else:
+            payload.pop("more", None)
+        text = json.dumps(payload, default=str)
+        if estimate_tokens(text) <= token_budget or rows <= 1:
+            return text
+        rows //= 2
+
+
+def _truncate(value):
+    if isinstance(value, list):
+        items = [_truncate(item) for item in value[:MAX_LIST_ITEMS]]
+        if len(value) > MAX_LIST_ITEMS:
+            items.append(f"... {len(value) - MAX_LIST_ITEMS} more")
+        return items
+    if isinstance(value, dict):
+        return {key: _truncate(item) for key, item in value.items()}
+    return value
+
+
+def encode_tool_result(df: pd.DataFrame, function_name: str, arguments: dict) -> str:
+    """Runs a tool (memoized) and returns the compact payload sent back to the model as the `tool` message."""
+    result = execute_tool(df, function_name, arguments)
+    if not isinstance(result, pd.DataFrame):
+        return json.dumps(_truncate(result), default=str)
+
+    if function_name == "fetch_more_rows":
+        # A page of an earlier result: keep paging within the original result.
+        source = execute_tool(df, *_source_call(df, arguments["result_id"])) if "Error" not in result.columns else None
+        return encode_frame(
+            result,
+            result_id=arguments["result_id"],
+            offset=max(int(arguments.get("offset", 0)), 0),
+            max_rows=max(int(arguments.get("limit", PAGE_ROWS)), 1),
+            source=source
+        )
+    return encode_frame(result, result_id=result_id_for(function_name, arguments))
+
+
+def _source_call(df: pd.DataFrame, result_id: str):
+    view = get_tool_view(df)
+    with view.results_lock:
+        return view.result_sources[result_id]
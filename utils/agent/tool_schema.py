@@ -1,3 +1,5 @@
+from utils.agent.tools import PAGE_ROWS
+
 tools = [
     {
         "type": "function",
@@ -140,5 +142,21 @@ tools = [
                 "required": ["status"]
             }
         }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "fetch_more_rows",
+            "description": "Fetch further rows of an earlier tool result that was cut short (its payload names the result_id and next offset).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "result_id": {"type": "string", "description": "The result_id from the earlier tool result."},
+                    "offset": {"type": "integer", "description": "Index of the first row to return."},
+                    "limit": {"type": "integer", "description": f"Number of rows to return (default {PAGE_ROWS})."}
+                },
+                "required": ["result_id", "offset"]
+            }
+        }
     }
 ]
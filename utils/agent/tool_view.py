@@ -0,0 +1,84 @@
+# utils/agent/tool_view.py
+
+import threading
+
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+
+from utils.data_processing import get_filter_index, positions_by_value
+from utils.frame_cache import cached_for_frame
+from utils.schema import PLATFORM_LOOKUP
+
+TOOL_RESULT_CACHE_SIZE = 256
+# Result ids handed to the model for paging, mapped back to the call that produced them.
+RESULT_SOURCE_CACHE_SIZE = 1024
+HIGH_IMPACT = 4
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+class ToolView:
+    """
+    Read-only, pre-normalized view of a dataset for the chat agent's tools.
+
+    Built once per dataset: lowercase title keys, numeric impact and the group
+    indexes (theme, topic, case study, platform, cost, implementation status) are
+    computed up front, so a tool call intersects position arrays instead of copying
+    or re-scanning the frame. The frame itself is never modified. Tool results are
+    memoized per (tool, normalized arguments) for as long as the dataset is loaded.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        filter_index = get_filter_index(df)
+        self.theme = filter_index.theme
+        self.case_study = filter_index.case_study
+        self.platform = filter_index.platform
+        self.cost = filter_index.cost
+        self.topic = positions_by_value(df['Catalog Topic Title'])
+
+        if 'Implementation Status' in df.columns:
+            self.status = positions_by_value(df['Implementation Status'])
+            self.status_missing = np.flatnonzero(df['Implementation Status'].isna().to_numpy())
+        else:
+            self.status, self.status_missing = {}, _EMPTY
+
+        title_keys = df['Title'].astype(str).str.strip().str.lower()
+        self.title = positions_by_value(title_keys)
+
+        self.impact = df['Impact'].to_numpy(dtype=np.float64, na_value=np.nan) if 'Impact' in df.columns else None
+        self.high_impact = np.flatnonzero(self.impact >= HIGH_IMPACT) if self.impact is not None else _EMPTY
+
+        self.results = LRUCache(maxsize=TOOL_RESULT_CACHE_SIZE)
+        self.result_sources = LRUCache(maxsize=RESULT_SOURCE_CACHE_SIZE)
+        self.results_lock = threading.Lock()  # tool calls may run on several threads at once
+
+    def platform_rows(self, platform: str):
+        """Positions for a platform name in any case, or None when the platform is not recognised (no filter)."""
+        if platform and platform.lower() in PLATFORM_LOOKUP:
+            return self.platform.get(PLATFORM_LOOKUP[platform.lower()], _EMPTY)
+        return None
+
+    @staticmethod
+    def intersect(positions, *others) -> np.ndarray:
+        """Intersects ascending position arrays, skipping None (an unfiltered dimension)."""
+        selections = sorted((other for other in (positions,) + others if other is not None), key=len)
+        if not selections:
+            return None
+        result = selections[0]
+        for other in selections[1:]:
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def rows(self, positions, columns) -> pd.DataFrame:
+        """Selected columns of the rows at `positions` (all rows when None), as a new frame."""
+        columns = [col for col in columns if col in self.df.columns]
+        if positions is None:
+            return self.df[columns]
+        return self.df.iloc[positions][columns]
+
+
+def get_tool_view(df: pd.DataFrame) -> ToolView:
+    """Returns the ToolView for this dataset, building it on first use."""
+    return cached_for_frame(df, "tool_view", ToolView)
@@ -1,5 +1,11 @@
+import hashlib
+
+import numpy as np
 import pandas as pd
+from utils.agent.tool_view import get_tool_view
 from utils.data_processing import compute_overall_statistics
+from utils.impact_cube import get_impact_cube
+from utils.search_index import get_search_index
 
 
 def get_dataset_info(df: pd.DataFrame) -> dict:
@@ -53,19 +59,17 @@ def rank_case_studies_by_impact(
     if "Impact" not in df.columns or df.empty:
         return pd.DataFrame({"Error": ["No impact data available"]})
 
-    df = df.copy()
-    df["Impact_Score"] = pd.to_numeric(df["Impact"], errors="coerce")  # Convert impact to numeric
-
     # If no grouping is provided, rank case studies overall
-    if group_by:
-        result = df.groupby(group_by).agg(
-            Average_Impact=("Impact_Score", "mean"),
-            Guidelines_Count=("Impact_Score", "count")
-        ).reset_index()
+    group_by = list(group_by or ["Case Study Title"])
+    cube = get_impact_cube(df)
+    if cube.covers(group_by):
+        # ✅ Roll-up of the per-dataset impact cube instead of a pass over every row
+        result = cube.rollup(group_by).rename(columns={"mean": "Average_Impact", "count": "Guidelines_Count"})
+        result = result[group_by + ["Average_Impact", "Guidelines_Count"]]
     else:
-        result = df.groupby("Case Study Title").agg(
-            Average_Impact=("Impact_Score", "mean"),
-            Guidelines_Count=("Impact_Score", "count")
+        result = df.groupby(group_by, observed=True).agg(
+            Average_Impact=("Impact", "mean"),
+            Guidelines_Count=("Impact", "count")
         ).reset_index()
 
     # Sort by impact
@@ -75,49 +79,44 @@ def rank_case_studies_by_impact(
 
 
 def compare_guideline_across_sites(df: pd.DataFrame, guideline_id: str, platform: str = None) -> pd.DataFrame:
-    """Compare how sites implement a specific guideline across platforms."""
-    df = df.copy()
-    
-    # Ensure guideline exists
-    if guideline_id not in df['Title'].unique():
+    """Compare how sites implement a specific guideline across platforms (exact, case-insensitive title match)."""
+    view = get_tool_view(df)
+    positions = view.title.get(guideline_id.strip().lower())
+    if positions is None:
         return pd.DataFrame({"Error": [f"Guideline '{guideline_id}' not found"]})
 
-    # Filter by guideline
-    guideline_df = df[df['Title'] == guideline_id]
+    positions = view.intersect(positions, view.platform_rows(platform))
+    return view.rows(positions, ['Case Study Title', 'Impact', 'Citation Code: Platform-Specific', 'Estimated Cost'])
+
 
-    # Normalize platform input
-    platform_mapping = {"desktop": "D", "mobile": "M", "app": "A"}
-    if platform and platform.lower() in platform_mapping:
-        guideline_df = guideline_df[
-            guideline_df['Citation Code: Platform-Specific'].str.contains(platform_mapping[platform.lower()], na=False)
-        ]
-    
-    return guideline_df[['Case Study Title', 'Impact', 'Citation Code: Platform-Specific', 'Estimated Cost']]
 
+# Fields the agent's guideline search looks at (the Overview box's, see search_index.SEARCH_FIELDS).
+GUIDELINE_SEARCH_FIELDS = ['Title', 'Citation Code: Platform-Specific', 'Catalog Theme Title', 'Catalog Topic Title']
 
 
 def search_guideline(df: pd.DataFrame, search_term: str) -> pd.DataFrame:
     """Search guidelines by number, title, theme, or topic."""
-    return df[
-        df['Title'].str.contains(search_term, case=False, na=False) |
-        df['Catalog Theme Title'].str.contains(search_term, case=False, na=False) |
-        df['Catalog Topic Title'].str.contains(search_term, case=False, na=False)
-    ][['Title', 'Catalog Theme Title', 'Catalog Topic Title', 'Implementation Status', 'Impact']]
+    positions = get_search_index(df).search(search_term, fields=GUIDELINE_SEARCH_FIELDS)
+    return get_tool_view(df).rows(
+        positions, ['Citation Code: Platform-Specific', 'Title', 'Catalog Theme Title', 'Catalog Topic Title',
+                    'Implementation Status', 'Impact']
+    )
 
 
 
 def get_theme_guidelines(df: pd.DataFrame, theme: str, topic: str = None) -> pd.DataFrame:
     """Get guidelines within a given theme and optionally filter by topic."""
-    if theme not in df['Catalog Theme Title'].unique():
+    view = get_tool_view(df)
+    if theme not in view.theme:
         return pd.DataFrame({"Error": [f"Theme '{theme}' not found"]})
 
-    mask = df['Catalog Theme Title'] == theme
+    positions = view.theme[theme]
     if topic:
-        if topic not in df['Catalog Topic Title'].unique():
+        if topic not in view.topic:
             return pd.DataFrame({"Error": [f"Topic '{topic}' not found within theme '{theme}'"]})
-        mask &= df['Catalog Topic Title'] == topic
+        positions = view.intersect(positions, view.topic[topic])
 
-    return df[mask][['Title', 'Catalog Theme Title', 'Catalog Topic Title', 'Impact']]
+    return view.rows(positions, ['Title', 'Catalog Theme Title', 'Catalog Topic Title', 'Impact'])
 
 
 
@@ -133,32 +132,19 @@ def analyze_guidelines_by_criteria(
     na: bool = False
 ) -> pd.DataFrame:
     """Flexible analysis of guidelines based on multiple criteria."""
-    filtered = df.copy()
-    
-    if theme:
-        filtered = filtered[filtered['Catalog Theme Title'] == theme]
-    if topic:
-        filtered = filtered[filtered['Catalog Topic Title'] == topic]
-
-    # Handle platform mapping
-    platform_mapping = {"desktop": "D", "mobile": "M", "app": "A"}
-    if platform and platform.lower() in platform_mapping:
-        filtered = filtered[filtered['Citation Code: Platform-Specific'].str.contains(platform_mapping[platform.lower()], na=False)]
-
-    if low_cost:
-        filtered = filtered[filtered["Estimated Cost"] == "low"]
-    
-    if high_impact:
-        filtered = filtered[pd.to_numeric(filtered['Impact'], errors='coerce').fillna(0) >= 4]
-
-    if violated:
-        filtered = filtered[filtered['Implementation Status'] == 'violated']
-    if adhered:
-        filtered = filtered[filtered['Implementation Status'] == 'adhered']
-    if na:
-        filtered = filtered[filtered['Implementation Status'].isna()]
-
-    return filtered[['Title', 'Catalog Theme Title', 'Catalog Topic Title', 'Impact', 'Implementation Status']]
+    view = get_tool_view(df)
+    empty = np.empty(0, dtype=np.intp)
+    positions = view.intersect(
+        view.theme.get(theme, empty) if theme else None,
+        view.topic.get(topic, empty) if topic else None,
+        view.platform_rows(platform),
+        view.cost.get("low", empty) if low_cost else None,
+        view.high_impact if high_impact else None,
+        view.status.get('violated', empty) if violated else None,
+        view.status.get('adhered', empty) if adhered else None,
+        view.status_missing if na else None
+    )
+    return view.rows(positions, ['Title', 'Catalog Theme Title', 'Catalog Topic Title', 'Impact', 'Implementation Status'])
 
 
 
@@ -168,83 +154,144 @@ def analyze_site_adherence(
     platform: str = None,
     low_cost: bool = False,
     high_impact: bool = False
-) -> pd.DataFrame:
-    """Analyze sites based on guideline adherence patterns."""
-    df = df.copy()
-    df['Impact_Score'] = pd.to_numeric(df['Impact'], errors='coerce').fillna(0)
-
-    mask = df['Implementation Status'] == status
-
-    platform_mapping = {"desktop": "D", "mobile": "M", "app": "A"}
-    if platform and platform.lower() in platform_mapping:
-        mask &= df['Citation Code: Platform-Specific'].str.contains(platform_mapping[platform.lower()], na=False)
-
-    if low_cost:
-        mask &= df['Estimated Cost'] == 'low'
-    if high_impact:
-        mask &= df['Impact_Score'] >= 4
-
-    return df[mask].groupby('Case Study Title').size().sort_values(ascending=False)
-
+) -> pd.Series:
+    """Analyze sites based on guideline adherence patterns: guideline counts per site, highest first."""
+    view = get_tool_view(df)
+    empty = np.empty(0, dtype=np.intp)
+    positions = view.intersect(
+        view.status.get(status, empty),
+        view.platform_rows(platform),
+        view.cost.get("low", empty) if low_cost else None,
+        view.high_impact if high_impact else None
+    )
+    sites = df['Case Study Title'].iloc[positions]
+    return sites.value_counts(sort=False).loc[lambda counts: counts > 0].sort_values(ascending=False, kind="stable")
+
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+# Arguments whose case never changes a tool's result.
+CASE_INSENSITIVE_ARGUMENTS = {"guideline_id", "search_term", "platform"}
+
+
+def normalize_arguments(arguments: dict) -> tuple:
+    """Hashable form of a tool call's arguments: unset (None) values dropped, case folded where it is irrelevant."""
+    normalized = {}
+    for key, value in (arguments or {}).items():
+        if value is None:
+            continue
+        value = _freeze(value)
+        if key in CASE_INSENSITIVE_ARGUMENTS and isinstance(value, str):
+            value = value.lower()
+        normalized[key] = value
+    return tuple(sorted(normalized.items()))
+
+
+# Rows per page of a tool result, for the first page the model sees and for fetch_more_rows alike.
+PAGE_ROWS = 25
+
+
+def fetch_more_rows(df: pd.DataFrame, result_id: str, offset: int = 0, limit: int = PAGE_ROWS) -> pd.DataFrame:
+    """A page of an earlier tool result, which is recomputed (from the memo) if it was evicted."""
+    view = get_tool_view(df)
+    with view.results_lock:
+        source = view.result_sources.get(result_id)
+    if source is None:
+        return pd.DataFrame({"Error": [f"Unknown result_id '{result_id}'"]})
+    function_name, arguments = source
+    result = execute_tool(df, function_name, arguments)
+    offset = max(int(offset), 0)
+    return result.iloc[offset:offset + max(int(limit), 1)]
+
+
+def result_id_for(function_name: str, arguments: dict) -> str:
+    """Stable id of a tool result, derived from the call, so the same call always gets the same id."""
+    digest = hashlib.sha1(repr((function_name, normalize_arguments(arguments))).encode()).hexdigest()
+    return f"r{digest[:10]}"
+
+
+def execute_tool(df: pd.DataFrame, function_name: str, arguments: dict):
+    """
+    Runs a tool and returns its raw result: a DataFrame, or a dict for get_dataset_info.
 
+    Results are memoized per dataset on (function name, normalized arguments) and
+    shared between calls, so treat them as read-only. The dataset is never modified.
+    Frame results are registered under result_id_for(...) for fetch_more_rows.
+    """
+    view = get_tool_view(df)
+    key = (function_name, normalize_arguments(arguments))
+    with view.results_lock:
+        if key in view.results:
+            return view.results[key]
+    result = _run_tool(df, function_name, arguments)
+    with view.results_lock:
+        view.results[key] = result
+        if isinstance(result, pd.DataFrame) and function_name != "fetch_more_rows":
+            view.result_sources[result_id_for(function_name, arguments)] = (function_name, dict(arguments))
+    return result
 
 
 def execute_function_call(df: pd.DataFrame, function_name: str, arguments: dict):
     """
-    Executes a function based on OpenAI's tool calling response.
+    Executes a function based on OpenAI's tool calling response, returning plain
+    records (a dict for get_dataset_info). Memoized like execute_tool.
     """
+    view = get_tool_view(df)
+    key = ("records", function_name, normalize_arguments(arguments))
+    with view.results_lock:
+        if key in view.results:
+            return view.results[key]
+    result = execute_tool(df, function_name, arguments)
+    if isinstance(result, pd.DataFrame):
+        result = result.to_dict(orient="records")
+    with view.results_lock:
+        view.results[key] = result
+    return result
+
+
+def _run_tool(df: pd.DataFrame, function_name: str, arguments: dict):
     if function_name == "get_dataset_info":
         return get_dataset_info(df)
 
     elif function_name == "compute_overall_statistics":
-        return compute_overall_statistics(df).to_dict(orient="records")
+        return compute_overall_statistics(df)
     
     elif function_name in ["rank_case_studies_by_impact", "rank_case_studies_by_performance"]:
+        group_by = arguments.get("group_by", None)
+        unknown = [col for col in group_by or [] if col not in df.columns]
+        if unknown:
+            return pd.DataFrame({"Error": [f"Unknown column(s) to group by: {', '.join(unknown)}"]})
         return rank_case_studies_by_impact(
             df,
-            group_by=arguments.get("group_by", None),
+            group_by=group_by,
             ascending=arguments.get("ascending", False)
-        ).to_dict(orient="records")
+        )
     
     elif function_name == "compare_guideline_across_sites":
-        guideline_id = arguments["guideline_id"].strip().lower()
-        platform = arguments.get("platform", None)
-        
-        # Normalize possible formats (strip whitespace and enforce lowercase)
-        df["Title"] = df["Title"].astype(str).str.strip().str.lower()
-        
-        # Exact match instead of contains to prevent false positives
-        matches = df[df['Title'] == guideline_id]
-        
-        if matches.empty:
-            return pd.DataFrame({"Error": [f"Guideline '{arguments['guideline_id']}' not found"]}).to_dict(orient="records")
-        
-        # Normalize platform input
-        platform_mapping = {"desktop": "D", "mobile": "M", "app": "A"}
-        if platform and platform.lower() in platform_mapping:
-            matches = matches[matches['Citation Code: Platform-Specific'].str.contains(platform_mapping[platform.lower()], na=False)]
-        
-        return matches[['Case Study Title', 'Impact', 'Citation Code: Platform-Specific', 'Estimated Cost']].to_dict(orient="records")
+        return compare_guideline_across_sites(
+            df,
+            guideline_id=arguments["guideline_id"],
+            platform=arguments.get("platform", None)
+        )
     
     elif function_name == "search_guideline":
-        required_columns = ["Title", "Catalog Theme Title", "Catalog Topic Title", "Implementation Status", "Impact"]
-        available_columns = [col for col in required_columns if col in df.columns]
-        
-        if not available_columns:
-            return pd.DataFrame({"Error": ["No matching columns found in dataset"]}).to_dict(orient="records")
-        
-        return df[
-            (df['Title'].str.contains(arguments["search_term"], case=False, na=False)) | 
-            (df['Catalog Theme Title'].str.contains(arguments["search_term"], case=False, na=False)) | 
-            (df['Catalog Topic Title'].str.contains(arguments["search_term"], case=False, na=False))
-        ][available_columns].to_dict(orient="records")
+        return search_guideline(df, arguments["search_term"])
     
     elif function_name == "get_theme_guidelines":
         return get_theme_guidelines(
             df,
             theme=arguments["theme"],
             topic=arguments.get("topic", None)
-        ).to_dict(orient="records")
+        )
     
     elif function_name == "analyze_guidelines_by_criteria":
         return analyze_guidelines_by_criteria(
@@ -257,16 +304,25 @@ def execute_function_call(df: pd.DataFrame, function_name: str, arguments: dict)
             violated=arguments.get("violated", None),
             adhered=arguments.get("adhered", None),
             na=arguments.get("na", None)
-        ).to_dict(orient="records")
+        )
     
     elif function_name == "analyze_site_adherence":
-        return analyze_site_adherence(
+        counts = analyze_site_adherence(
             df,
             status=arguments["status"],
             platform=arguments.get("platform", None),
             low_cost=arguments.get("low_cost", None),
             high_impact=arguments.get("high_impact", None)
-        ).to_dict(orient="records")
+        )
+        return pd.DataFrame({"Case Study Title": counts.index.astype(object), "Guidelines": counts.to_numpy(dtype=int)})
+
+    elif function_name == "fetch_more_rows":
+        return fetch_more_rows(
+            df,
+            result_id=arguments["result_id"],
+            offset=arguments.get("offset", 0),
+            limit=arguments.get("limit", PAGE_ROWS)
+        )
     
     else:
         raise ValueError(f"Unknown function: {function_name}")
@@ -1,18 +1,114 @@
 import streamlit as st
 from openai import OpenAI
 from  .agent.tool_schema import tools
-from .agent.tools import execute_function_call
+from .agent.result_encoder import encode_tool_result, estimate_tokens
+from .agent.tool_view import get_tool_view
+from .agent.response_cache import get_response_cache, response_cache_key
+from .agent.intent_router import route, format_answer
+from .agent.tools import execute_tool, result_id_for
+from .agent.conversation import append_turn, build_history, history_key, make_turn, results_in_window
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import json
+import time
+
+# Tool calls from one model response run side by side on this pool.
+TOOL_WORKERS = 8
+# Extra tool rounds the follow-up may use (e.g. fetch_more_rows on a cut-short result)
+# before the final request, which still sees the tools but may not call them.
+MAX_PAGING_ROUNDS = 1
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="chat-tool")
+
+
+def run_tool_call(df: pd.DataFrame, tool_call: dict, in_window: dict = None) -> dict:
+    """
+    Executes one tool call and returns it as a `tool` message holding the compact
+    encoding of the result (errors are reported to the model, not raised).
+
+    A call whose result is already in the replayed history (`in_window`, result_id ->
+    tool_call_id) is answered with a reference to it instead of the same payload again.
+    """
+    try:
+        name = tool_call["function"]["name"]
+        arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+        result_id = result_id_for(name, arguments)
+        if in_window and result_id in in_window and name != "fetch_more_rows":
+            content = json.dumps({
+                "result_id": result_id,
+                "unchanged": f"Same result as tool call {in_window[result_id]} earlier in this conversation; reuse it."
+            })
+        else:
+            content = encode_tool_result(df, name, arguments)
+    except Exception as e:
+        content = json.dumps({"error": f"{type(e).__name__}: {e}"})
+    return {
+        "role": "tool",
+        "tool_call_id": tool_call["id"],
+        "content": content
+    }
+
+
+def run_tool_calls(df: pd.DataFrame, tool_calls: list, in_window: dict = None) -> list:
+    """Executes all tool calls concurrently; the messages come back in the order of the calls."""
+    get_tool_view(df)  # build the shared view once, before the workers need it
+    futures = [_tool_executor.submit(run_tool_call, df, tool_call, in_window) for tool_call in tool_calls]
+    return [future.result() for future in futures]
+
+
+class StreamedReply:
+    """
+    Consumes one streamed chat completion.
+
+    text() yields the content deltas (for st.write_stream) while tool-call fragments
+    are assembled into `tool_calls`, in the message format the follow-up request
+    replays. `first_token_at` records when the first content token arrived.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.first_token_at = None
+        self._tool_calls = {}
+
+    def text(self):
+        for chunk in self.stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            for fragment in delta.tool_calls or []:
+                call = self._tool_calls.setdefault(
+                    fragment.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+                )
+                if fragment.id:
+                    call["id"] = fragment.id
+                if fragment.function is not None:
+                    call["function"]["name"] += fragment.function.name or ""
+                    call["function"]["arguments"] += fragment.function.arguments or ""
+            if delta.content:
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                yield delta.content
+
+    @property
+    def tool_calls(self) -> list:
+        return [self._tool_calls[index] for index in sorted(self._tool_calls)]
+
+
+def chat_client() -> OpenAI:
+    """OpenAI client; an OPENAI_BASE_URL secret points it at any compatible endpoint (e.g. a local mock)."""
+    return OpenAI(api_key=st.secrets["OPENAI_API_KEY"], base_url=st.secrets.get("OPENAI_BASE_URL"))
 
 
 def chat_interface(df: pd.DataFrame) -> None:
-    client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+    client = chat_client()
     
     if "openai_model" not in st.session_state:
         st.session_state.openai_model = "gpt-4o"
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "chat_timings" not in st.session_state:
+        st.session_state.chat_timings = []
+    if "chat_turns" not in st.session_state:
+        st.session_state.chat_turns = []  # API-side record of each exchange, replayed as history
 
     # ✅ Add CSS for chat styling
     st.markdown("""
@@ -32,6 +128,12 @@ def chat_interface(df: pd.DataFrame) -> None:
         </style>
     """, unsafe_allow_html=True)
 
+    st.toggle(
+        "Bypass response cache",
+        key="chat_cache_bypass",
+        help="Always ask the model, even for questions already answered for this dataset (the new answer replaces the cached one)."
+    )
+
     # ✅ Display previous chat messages
     st.markdown('<div class="chat-container">', unsafe_allow_html=True)
     for message in st.session_state.messages:
@@ -45,41 +147,119 @@ def chat_interface(df: pd.DataFrame) -> None:
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Call GPT with function calling enabled
-        completion = client.chat.completions.create(
-            model=st.session_state.openai_model,
-            messages=[{"role": "user", "content": prompt}],
-            tools=tools
-        )
+        started = time.perf_counter()
+        tool_result_tokens = 0
+        first_token_at = None
 
-        response = completion.choices[0].message
+        # ✅ Common, well-defined questions are answered by the local router without the model
+        routed = route(df, prompt, st.session_state.chat_turns)
+        if routed is not None:
+            function_name, arguments = routed
+            final_response = format_answer(df, prompt, function_name, arguments, execute_tool(df, function_name, arguments))
+            with st.chat_message("assistant"):
+                st.markdown(final_response)
+            st.session_state.chat_timings.append({
+                "time_to_first_token": time.perf_counter() - started,
+                "total": time.perf_counter() - started,
+                "tool_result_tokens": 0,
+                "routed": function_name
+            })
+            st.session_state.messages.append({"role": "assistant", "content": final_response})
+            append_turn(st.session_state.chat_turns, make_turn(prompt, final_response, routed=routed))
+            return
 
-        # ✅ Handle function calls dynamically
-        if hasattr(response, "tool_calls") and response.tool_calls:
-            for tool_call in response.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
+        # ✅ Earlier turns go along within a token budget: recent ones verbatim, older ones summarized
+        history = build_history(st.session_state.chat_turns)
+        in_window = results_in_window(history)
+        context = history_key(history)
+        tool_messages = []
 
-                # ✅ Execute function and pass results to GPT for a response
-                function_result = execute_function_call(df, function_name, function_args)
+        # Repeated questions about the same upload are answered from the response cache.
+        cache = get_response_cache()
+        dataset_hash = st.session_state.get("dataset_hash")
+        use_cache = dataset_hash is not None
+        read_cache = use_cache and not st.session_state.get("chat_cache_bypass", False)
+        selection_key = response_cache_key("tool_selection", prompt, dataset_hash, st.session_state.openai_model, context)
+        answer_key = response_cache_key("answer", prompt, dataset_hash, st.session_state.openai_model, context)
 
-                followup_completion = client.chat.completions.create(
-                    model=st.session_state.openai_model,
-                    messages=[
-                        {"role": "user", "content": prompt},
-                        {"role": "assistant", "content": f"Here is some background information:\n\n{function_result}"}
-                    ],
-                )
+        with st.chat_message("assistant"):
+            final_response = cache.get(answer_key) if read_cache else None
+            selection = {"content": None, "tool_calls": []}
+            if final_response is not None:
+                st.markdown(final_response)
+                first_token_at = time.perf_counter()
+            else:
+                selection = cache.get(selection_key) if read_cache else None
+                if selection is None:
+                    # Call GPT with function calling enabled; a direct answer is rendered as it streams in
+                    reply = StreamedReply(client.chat.completions.create(
+                        model=st.session_state.openai_model,
+                        messages=[*history, {"role": "user", "content": prompt}],
+                        tools=tools,
+                        stream=True
+                    ))
+                    final_response = st.write_stream(reply.text())
+                    first_token_at = reply.first_token_at
+                    selection = {"content": final_response, "tool_calls": reply.tool_calls}
+                    if use_cache:
+                        cache.put(selection_key, selection)
+                else:
+                    final_response = selection["content"]
+                    if final_response:
+                        st.markdown(final_response)
+                        first_token_at = time.perf_counter()
 
-                final_response = followup_completion.choices[0].message.content
+                # ✅ Run every requested tool at once, then answer from all results in one follow-up
+                if selection["tool_calls"]:
+                    tool_calls = list(selection["tool_calls"])
+                    tool_messages = run_tool_calls(df, tool_calls, in_window)
+                    messages = [
+                        *history,
+                        {"role": "user", "content": prompt},
+                        {"role": "assistant", "content": final_response or None, "tool_calls": tool_calls},
+                        *tool_messages
+                    ]
+                    parts = [final_response]
+                    # The follow-up keeps the tools so it can page a truncated result; only the
+                    # last round is told to answer (tool_choice="none") from what it has.
+                    for paging_round in range(MAX_PAGING_ROUNDS + 1):
+                        last_round = paging_round == MAX_PAGING_ROUNDS
+                        followup = StreamedReply(client.chat.completions.create(
+                            model=st.session_state.openai_model,
+                            messages=messages,
+                            tools=tools,
+                            tool_choice="none" if last_round else "auto",
+                            stream=True
+                        ))
+                        parts.append(st.write_stream(followup.text()))
+                        first_token_at = first_token_at or followup.first_token_at
+                        if last_round or not followup.tool_calls:
+                            break
+                        page_messages = run_tool_calls(df, followup.tool_calls, in_window)
+                        messages += [
+                            {"role": "assistant", "content": parts[-1] or None, "tool_calls": followup.tool_calls},
+                            *page_messages
+                        ]
+                        tool_calls += followup.tool_calls
+                        tool_messages += page_messages
+                    tool_result_tokens = sum(estimate_tokens(message["content"]) for message in tool_messages)
+                    final_response = "\n\n".join(part for part in parts if part)
+                    selection = {"content": selection["content"], "tool_calls": tool_calls}
 
-                # ✅ Display the final response
-                st.session_state.messages.append({"role": "assistant", "content": final_response})
-                with st.chat_message("assistant"):
-                    st.markdown(final_response)
+                if use_cache:
+                    cache.put(answer_key, final_response)
 
-        else:
-            # If GPT provides a direct response without calling a function
-            st.session_state.messages.append({"role": "assistant", "content": response.content})
-            with st.chat_message("assistant"):
-                st.markdown(response.content)
+        # ✅ Track time to first token (from sending the prompt to the first visible token)
+        if first_token_at is not None:
+            st.session_state.chat_timings.append({
+                "time_to_first_token": first_token_at - started,
+                "total": time.perf_counter() - started,
+                "tool_result_tokens": tool_result_tokens
+            })
+        st.session_state.messages.append({"role": "assistant", "content": final_response})
+        if in_window and tool_messages:
+            # Keep full results in the stored turn: the call a reference points to may be summarized later.
+            tool_messages = run_tool_calls(df, selection["tool_calls"])
+        append_turn(st.session_state.chat_turns, make_turn(
+            prompt, final_response, tool_calls=selection["tool_calls"], tool_messages=tool_messages
+        ))
@@ -1,10 +1,14 @@
 # utils/data_processing.py
 
 import pandas as pd
+import numpy as np
 import streamlit as st
 import re
 from typing import Dict
-import os
+
+from utils.schema import PLATFORM_NAMES
+from utils.frame_cache import cached_for_frame
+from utils.search_index import get_search_index
 
 def compute_overall_statistics(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -20,12 +24,16 @@ def compute_overall_statistics(df: pd.DataFrame) -> pd.DataFrame:
             "App": [0]
         })
     
-    guideline_id = df["Citation Code: Platform-Specific"].astype(str).str.strip()
-    
-    total = len(guideline_id)
-    desktop_count = (guideline_id.str[-1].str.upper() == "D").sum()
-    mobile_count  = (guideline_id.str[-1].str.upper() == "M").sum()
-    app_count     = (guideline_id.str[-1].str.upper() == "A").sum()
+    if "platform" in df.columns:
+        platform_counts = df["platform"].value_counts()
+    else:
+        guideline_id = df["Citation Code: Platform-Specific"].astype(str).str.strip()
+        platform_counts = guideline_id.str[-1].str.upper().map(PLATFORM_NAMES).value_counts()
+
+    total = len(df)
+    desktop_count = int(platform_counts.get("Desktop", 0))
+    mobile_count  = int(platform_counts.get("Mobile", 0))
+    app_count     = int(platform_counts.get("App", 0))
     
     return pd.DataFrame({
         "Total Guidelines": [total],
@@ -35,6 +43,82 @@ def compute_overall_statistics(df: pd.DataFrame) -> pd.DataFrame:
     })
 
 
+def positions_by_value(series: pd.Series) -> Dict[str, np.ndarray]:
+    """Maps each distinct value of a column to the (ascending) row positions holding it."""
+    categorical = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+    codes = categorical.cat.codes.to_numpy()
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=len(categorical.cat.categories))
+    # Rows with a missing value (code -1) sort first; skip past them.
+    offsets = np.concatenate(([0], np.cumsum(counts))) + np.count_nonzero(codes < 0)
+    return {
+        value: order[offsets[i]:offsets[i + 1]]
+        for i, value in enumerate(categorical.cat.categories)
+        if counts[i]
+    }
+
+
+class FilterIndex:
+    """
+    Inverted indexes for the Overview filters, built once per dataset.
+
+    Holds the sorted row positions for every theme, case study, platform and cost
+    level, so a filter combination is answered by intersecting position arrays
+    instead of scanning full columns.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self.theme = positions_by_value(df["Catalog Theme Title"])
+        self.case_study = positions_by_value(df["Case Study Title"])
+        self.platform = positions_by_value(df["platform"]) if "platform" in df.columns else {}
+        self.cost = positions_by_value(df["Estimated Cost"]) if "Estimated Cost" in df.columns else {}
+
+    def positions(
+        self,
+        theme_filter: str = "All",
+        case_study_filter: str = "All",
+        platform_filter: list = None,
+        low_cost_filter: bool = False
+    ):
+        """Returns the ascending row positions matching the filters, or None when nothing is filtered."""
+        empty = np.empty(0, dtype=np.intp)
+        selections = []
+        if theme_filter != "All":
+            selections.append(self.theme.get(theme_filter, empty))
+        if case_study_filter != "All":
+            selections.append(self.case_study.get(case_study_filter, empty))
+        if platform_filter:
+            parts = [self.platform.get(platform, empty) for platform in platform_filter]
+            selections.append(np.sort(np.concatenate(parts)))
+        if low_cost_filter:
+            selections.append(self.cost.get("low", empty))
+
+        if not selections:
+            return None
+        # Intersect smallest-first so every step works on the shortest possible arrays.
+        selections.sort(key=len)
+        positions = selections[0]
+        for other in selections[1:]:
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+
+def get_filter_index(df: pd.DataFrame) -> FilterIndex:
+    """Returns the FilterIndex for this dataset, building it on first use."""
+    return cached_for_frame(df, "filter_index", FilterIndex)
+
+
+def get_citation_index(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Maps each citation code to the ascending row positions holding it. A code appears
+    once per case study it was reviewed in. Built once per dataset.
+    """
+    return cached_for_frame(
+        df, "citation_index", lambda frame: positions_by_value(frame["Citation Code: Platform-Specific"])
+    )
+
+
 def apply_chart_filters(
     df: pd.DataFrame,
     search_term: str = "",
@@ -47,222 +131,240 @@ def apply_chart_filters(
 ) -> pd.DataFrame:
     """
     Applies filters to the DataFrame and optionally analyzes performance.
+
+    Filters are resolved to row positions through the dataset's FilterIndex and
+    SearchIndex, and the rows are taken with a single iloc at the end. With no filters and no sorting
+    the input frame itself is returned, so treat the result as read-only.
     """
-    filtered_df = df.copy()
-
-    # Apply theme filter
-    if theme_filter != "All":
-        filtered_df = filtered_df[filtered_df['Catalog Theme Title'] == theme_filter]
-
-    # Apply case study filter
-    if case_study_filter != "All":
-        filtered_df = filtered_df[filtered_df['Case Study Title'] == case_study_filter]
-
-    # Apply platform filter
-    if platform_filter is None:
-        platform_filter = []
-    if platform_filter:
-        mask = pd.Series(False, index=filtered_df.index)
-        for platform in platform_filter:
-            if platform == "Desktop":
-                mask |= filtered_df['Citation Code: Platform-Specific'].str.contains('D', na=False)
-            elif platform == "Mobile":
-                mask |= filtered_df['Citation Code: Platform-Specific'].str.contains('M', na=False)
-            elif platform == "App":
-                mask |= filtered_df['Citation Code: Platform-Specific'].str.contains('A', na=False)
-        filtered_df = filtered_df[mask]
-
-    # Apply search filter
+    positions = get_filter_index(df).positions(
+        theme_filter=theme_filter,
+        case_study_filter=case_study_filter,
+        platform_filter=platform_filter,
+        low_cost_filter=low_cost_filter
+    )
+
+    # Apply search filter (title, citation code, theme, topic) through the dataset's SearchIndex
     if search_term:
-        filtered_df = filtered_df[
-            filtered_df['Title'].str.contains(search_term, case=False, na=False) |
-            filtered_df['Citation Code: Platform-Specific'].str.contains(search_term, case=False, na=False) |
-            filtered_df['Catalog Theme Title'].str.contains(search_term, case=False, na=False) |
-            filtered_df['Catalog Topic Title'].str.contains(search_term, case=False, na=False)
-        ]
+        matches = get_search_index(df).search(search_term)
+        positions = matches if positions is None else np.intersect1d(positions, matches, assume_unique=True)
+
+    # Apply impact sorting
+    if sort_by_impact:
+        if "Impact" not in df.columns:
+            st.warning("The 'Impact' column is missing in your dataset. Please verify your CSV file.")
+        else:
+            if positions is None:
+                positions = np.arange(len(df))
+            # 'Impact' is already float32 from the ingest schema; NaN sorts last.
+            impact = df["Impact"].to_numpy()[positions]
+            positions = positions[np.argsort(-impact, kind="stable")]
 
-    # Apply low cost filter
-    if low_cost_filter:
-        filtered_df = filtered_df[filtered_df["Estimated Cost"] == "low"]
+    filtered_df = df if positions is None else df.iloc[positions]
 
     # Performance analysis
     if performance_analysis:
-        performance_df = filtered_df.groupby('Case Study Title').agg({
+        performance_df = filtered_df.groupby('Case Study Title', observed=True).agg({
             'Impact': ['mean', 'count']
         }).reset_index()
         performance_df.columns = ['Case Study Title', 'Average Impact', 'Guidelines Count']
         return performance_df.sort_values('Average Impact', ascending=False)
 
-    # Apply impact sorting
-    if sort_by_impact:
-        impact_col = None
-        for col in filtered_df.columns:
-            if col.lower() == "impact":
-                impact_col = col
-                break
-        if impact_col is None:
-            st.warning("The 'Impact' column is missing in your dataset. Please verify your CSV file.")
-        else:
-            filtered_df["impact_numeric"] = pd.to_numeric(filtered_df[impact_col], errors='coerce')
-            filtered_df = filtered_df.sort_values("impact_numeric", ascending=False)
-            filtered_df = filtered_df.drop(columns=["impact_numeric"])
-
     return filtered_df
 
 
-def process_datasets(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
-    """Processes the uploaded dataset to generate specific filtered subsets."""
-    processed_dfs = {}
+CITATION = 'Citation Code: Platform-Specific'
+INCONSISTENCY_KEYS = ['Case Study Title', 'guideline_base']
 
-    processed_dfs = {}
 
-    # Ensure the downloads folder exists
-    output_dir = "downloads"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    #--------------------------------------------------------------
-    # Guidelines not yet rated
-    if 'Judgement' in df.columns:
-        not_rated = df[df['Judgement'] == 'not_rated'][['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Gemini URL']]
-        processed_dfs['1. Not Rated Guidelines'] = not_rated
-    
-    #--------------------------------------------------------------
-    # Guidelines missing pin links
-    if 'implementation example urls' in df.columns:
-        empty_link_judgement = df[
-            (df['implementation example urls'].isna()) & 
-            (df['Judgement'] != 'not_applicable') & 
-            (df['Judgement'] != 'not_rated')
-        ][['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Gemini URL']]
-        processed_dfs['2. Guidelines Missing Pins'] = empty_link_judgement
-    
-    #--------------------------------------------------------------
-    # Guidelines missing screenshots
-    if 'Image URLs' in df.columns:
-        empty_image_urls = df[df['Image URLs'].isna() & 
-                              (df['Judgement'] != 'not_applicable') & 
-                              (df['Judgement'] != 'not_rated')]
-        processed_dfs['3. Guidelines Missing Screenshots'] = empty_image_urls[['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Judgement', 'Scenarios', 'Gemini URL']]
-
-    #--------------------------------------------------------------
-    # Non-empty 'Client-Facing Comment'
-    if 'Client-Facing Comment' in df.columns:
-        client_comment = df[df['Client-Facing Comment'].notna()][['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Gemini URL', 'Client-Facing Comment', 'Image URLs']]
-        processed_dfs['4. Guidelines including Client-Facing Comments'] = client_comment
-
-    #--------------------------------------------------------------
-    # Non-empty 'Internal Comment'
-    if 'Internal Comment' in df.columns:
-        internal_comment = df[df['Internal Comment'].notna()][['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Judgement', 'Gemini URL', 'Internal Comment', 'Image URLs']]
-        processed_dfs['5. Guidelines including Internal Comments'] = internal_comment
-
-    #--------------------------------------------------------------
-    # Mapping guidelines where "manual_judgment" = True
-    if 'Is Manual Judgement?' in df.columns:
-        df['Is Manual Judgement?'] = df['Is Manual Judgement?'].astype(bool)
-        manual_judgement = df[df['Is Manual Judgement?']][
-            ['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Judgement', 'Gemini URL', 'Client-Facing Comment', 'Internal Comment', 'Image URLs']
-        ]
-        processed_dfs['6. Guideline With Manual Judgement'] = manual_judgement
-
-    #--------------------------------------------------------------
-    # Mapping guidelines where "Is Nudged" = True
-    if 'Is Nudged?' in df.columns:
-        df['Is Nudged?'] = df['Is Nudged?'].astype(bool)
-        nudged_true = df[df['Is Nudged?']][
-            ['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Judgement', 'Gemini URL', 'Client-Facing Comment', 'Internal Comment', 'Image URLs']
-        ]
-        processed_dfs['7. Nudged Guidelines'] = nudged_true
-
-    #--------------------------------------------------------------
-    # Mapping guidelines where "Needs Discussion" = True
-    if 'Needs Discussion?' in df.columns:
-        df['Needs Discussion?'] = df['Needs Discussion?'].astype(bool)
-        needs_discussion = df[df['Needs Discussion?']][
-            ['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Gemini URL', 'Image URLs', 'Internal Comment']
-        ]
-        processed_dfs['8. Guidelines Needing Discussion'] = needs_discussion
-
-    #--------------------------------------------------------------
-    # Filtering "N/A" Judgments
-    if 'Judgement' in df.columns:
-        na_judgment_guidelines = df[df['Judgement'].str.strip().str.upper() == 'N/A']
-        processed_dfs['9. All N/A Judgment Guidelines'] = na_judgment_guidelines[
-            ['Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Judgement']
-        ]
-    
-    #--------------------------------------------------------------
-    # Missing Master Texts
-    if 'Master Text(s)' in df.columns and 'Judgement' in df.columns:
-        no_master_text_df = df[df['Master Text(s)'].isna() & df['Judgement'].isin(['adhered_high', 'violated_high'])][
-            ['Citation Code: Platform-Specific', 'Title', 'Judgement', 'Master Text(s)']
-        ].drop_duplicates(subset=['Citation Code: Platform-Specific', 'Judgement'])
-        processed_dfs['10. Missing Master Texts'] = no_master_text_df
-
-
-    #--------------------------------------------------------------
-    # High-Impact Guidelines
-    if 'Impact' in df.columns:
-        df['Impact'] = pd.to_numeric(df['Impact'], errors='coerce')
-        high_impact_df = df[(df['Impact'] >= 3) | (df['Impact'] <= -3)][
-            ['Citation Code: Platform-Specific', 'Impact', 'Case Study Title', 'Title', 'Judgement', 'Gemini URL']
-        ]
-        processed_dfs['11. High-Impact Guidelines'] = high_impact_df
-
-
-    #--------------------------------------------------------------
-    # Make a df copy to keep the original untouched and modify 'ID' to 'Guideline' in df_temp
-    df_temp = df.copy()
-    df_temp['Guideline'] = df_temp['Citation Code: Platform-Specific'].apply(lambda id: id[:-1] if pd.notna(id) else id)
-
-    # Print judgement differences across platforms (use df_temp)
-    inconsistencies = []
-    for (website, guideline), group in df_temp.groupby(['Case Study Title', 'Guideline']):
-        if group['Judgement'].nunique() > 1:
-            judgements = group[['Citation Code: Platform-Specific', 'Judgement', 'Gemini URL']].to_dict('records')
-            inconsistencies.append({'Case Study Title': website, 'Guideline': guideline, 'Judgements': judgements})
-
-    # Convert the inconsistencies list to a DataFrame and to csv
-    inconsistencies_df = pd.DataFrame(inconsistencies)
-    processed_dfs['Judgment Inconsistencies'] = inconsistencies_df
+def _category_mask(series: pd.Series, predicate) -> np.ndarray:
+    """
+    Evaluates a vectorized predicate (Series -> bool Series) on a column. For
+    categoricals it runs once over the categories and is mapped back through the
+    codes, so the per-row work is an integer lookup. Missing values are False.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        hits = np.append(predicate(series.cat.categories.to_series()).to_numpy(dtype=bool), False)
+        return hits[series.cat.codes.to_numpy()]
+    return predicate(series).fillna(False).to_numpy(dtype=bool)
 
 
-    #--------------------------------------------------------------
-    # Most unusual site: Most nudged and manually rated
-    if {'Case Study Title', 'Citation Code: Platform-Specific', 'Judgement'}.issubset(df.columns):
-    
-        # Ensure 'Citation Code: Platform-Specific' is a string and extract guideline ID
-        df['guideline'] = df['Citation Code: Platform-Specific'].astype(str).str[:-1]
+class ReportEngine:
+    """
+    Builds the Downloads QA reports for one dataset without modifying it.
 
-        # Group by Case Study and Guideline
-        grouped = df.groupby(['Case Study Title', 'guideline'])
+    Every mask a report needs (judgement classes, empty fields, review flags, impact
+    range, judgement inconsistencies) is computed at most once and shared across
+    reports; the inconsistency reports come from a single groupby with nunique.
+    """
 
-        # Identify inconsistent judgments
-        inconsistencies = grouped.filter(lambda x: x['Judgement'].nunique() > 1)
+    # Report name -> (columns the report needs, builder method, output columns).
+    REPORTS = {
+        '1. Not Rated Guidelines': (
+            ['Judgement'], '_not_rated',
+            [CITATION, 'Case Study Title', 'Title', 'Gemini URL']),
+        '2. Guidelines Missing Pins': (
+            ['implementation example urls'], '_missing_pins',
+            [CITATION, 'Case Study Title', 'Title', 'Gemini URL']),
+        '3. Guidelines Missing Screenshots': (
+            ['Image URLs'], '_missing_screenshots',
+            [CITATION, 'Case Study Title', 'Title', 'Judgement', 'Scenarios', 'Gemini URL']),
+        '4. Guidelines including Client-Facing Comments': (
+            ['Client-Facing Comment'], '_client_comments',
+            [CITATION, 'Case Study Title', 'Title', 'Gemini URL', 'Client-Facing Comment', 'Image URLs']),
+        '5. Guidelines including Internal Comments': (
+            ['Internal Comment'], '_internal_comments',
+            [CITATION, 'Case Study Title', 'Title', 'Judgement', 'Gemini URL', 'Internal Comment', 'Image URLs']),
+        '6. Guideline With Manual Judgement': (
+            ['Is Manual Judgement?'], '_manual_judgement',
+            [CITATION, 'Case Study Title', 'Title', 'Judgement', 'Gemini URL', 'Client-Facing Comment', 'Internal Comment', 'Image URLs']),
+        '7. Nudged Guidelines': (
+            ['Is Nudged?'], '_nudged',
+            [CITATION, 'Case Study Title', 'Title', 'Judgement', 'Gemini URL', 'Client-Facing Comment', 'Internal Comment', 'Image URLs']),
+        '8. Guidelines Needing Discussion': (
+            ['Needs Discussion?'], '_needs_discussion',
+            [CITATION, 'Case Study Title', 'Title', 'Gemini URL', 'Image URLs', 'Internal Comment']),
+        '9. All N/A Judgment Guidelines': (
+            ['Judgement'], '_na_judgement',
+            [CITATION, 'Case Study Title', 'Title', 'Judgement']),
+        '10. Missing Master Texts': (
+            ['Master Text(s)', 'Judgement'], '_missing_master_texts',
+            [CITATION, 'Title', 'Judgement', 'Master Text(s)']),
+        '11. High-Impact Guidelines': (
+            ['Impact'], '_high_impact',
+            [CITATION, 'Impact', 'Case Study Title', 'Title', 'Judgement', 'Gemini URL']),
+        'Judgment Inconsistencies': (
+            ['Case Study Title', 'guideline_base', 'Judgement'], '_judgment_inconsistencies', None),
+        'SItes by Deviation': (
+            ['Case Study Title', 'guideline_base', 'Judgement'], '_sites_by_deviation', None),
+    }
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._masks = {}
+        self._inconsistency_records = None
+
+    def report_names(self) -> list:
+        """Names of the reports this dataset has the columns for, in display order."""
+        return [
+            name for name, (required, _, _) in self.REPORTS.items()
+            if set(required).issubset(self.df.columns)
+        ]
 
-        if inconsistencies.empty:
-            print("✅ No judgment inconsistencies found.")
-        else:
-            # Collect inconsistent cases
-            inconsistency_records = (
-                inconsistencies.groupby(['Case Study Title', 'guideline'])
-                .apply(lambda g: g[['Citation Code: Platform-Specific', 'Judgement', 'Gemini URL']].to_dict(orient='records'))
-                .reset_index()
-                .rename(columns={0: 'Judgements'})  # Ensure correct column assignment
+    def build(self, name: str) -> pd.DataFrame:
+        """Builds one report."""
+        _, method, columns = self.REPORTS[name]
+        result = getattr(self, method)()
+        if columns is not None:
+            result = self.df.loc[result, [col for col in columns if col in self.df.columns]]
+        return result
+
+    def build_all(self) -> Dict[str, pd.DataFrame]:
+        """Builds every available report."""
+        return {name: self.build(name) for name in self.report_names()}
+
+    # -- shared masks ---------------------------------------------------------
+
+    def _mask(self, name: str, compute) -> np.ndarray:
+        if name not in self._masks:
+            self._masks[name] = compute()
+        return self._masks[name]
+
+    def _judgement_is(self, *values) -> np.ndarray:
+        return self._mask(
+            ('judgement', values),
+            lambda: _category_mask(self.df['Judgement'], lambda s: s.isin(values))
+        )
+
+    def _rated(self) -> np.ndarray:
+        # Same rule as before: anything but not_applicable / not_rated (a missing judgement counts as rated).
+        return self._mask('rated', lambda: ~self._judgement_is('not_applicable', 'not_rated'))
+
+    def _is_empty(self, col: str) -> np.ndarray:
+        return self._mask(('empty', col), lambda: self.df[col].isna().to_numpy())
+
+    def _flag(self, col: str) -> np.ndarray:
+        return self._mask(('flag', col), lambda: self.df[col].fillna(False).to_numpy(dtype=bool))
+
+    # -- reports ----------------------------------------------------------------
+
+    def _not_rated(self):
+        return self._judgement_is('not_rated')
+
+    def _missing_pins(self):
+        return self._is_empty('implementation example urls') & self._rated()
+
+    def _missing_screenshots(self):
+        return self._is_empty('Image URLs') & self._rated()
+
+    def _client_comments(self):
+        return ~self._is_empty('Client-Facing Comment')
+
+    def _internal_comments(self):
+        return ~self._is_empty('Internal Comment')
+
+    def _manual_judgement(self):
+        return self._flag('Is Manual Judgement?')
+
+    def _nudged(self):
+        return self._flag('Is Nudged?')
+
+    def _needs_discussion(self):
+        return self._flag('Needs Discussion?')
+
+    def _na_judgement(self):
+        return self._mask(
+            'na_judgement',
+            lambda: _category_mask(self.df['Judgement'], lambda s: s.astype(str).str.strip().str.upper() == 'N/A')
+        )
+
+    def _missing_master_texts(self):
+        mask = self._is_empty('Master Text(s)') & self._judgement_is('adhered_high', 'violated_high')
+        # Full-frame report; handled here because of the de-duplication.
+        return (
+            self.df.loc[mask, [CITATION, 'Title', 'Judgement', 'Master Text(s)']]
+            .drop_duplicates(subset=[CITATION, 'Judgement'])
+            .index
+        )
+
+    def _high_impact(self):
+        impact = self.df['Impact'].to_numpy()
+        return (impact >= 3) | (impact <= -3)
+
+    def _inconsistencies(self) -> pd.DataFrame:
+        """
+        One row per (case study, guideline) whose platforms disagree on the judgement,
+        with the per-platform judgements as a list of records. One groupby pass.
+        """
+        if self._inconsistency_records is None:
+            df = self.df
+            distinct = df.groupby(INCONSISTENCY_KEYS, observed=True)['Judgement'].transform('nunique')
+            rows = df.loc[distinct.to_numpy() > 1, INCONSISTENCY_KEYS + [CITATION, 'Judgement', 'Gemini URL']]
+            rows = rows.sort_values(INCONSISTENCY_KEYS, kind='stable')
+
+            keys = list(zip(rows['Case Study Title'].astype(object), rows['guideline_base'].astype(object)))
+            records = rows[[CITATION, 'Judgement', 'Gemini URL']].astype(object).to_dict('records')
+            grouped = {}
+            for key, record in zip(keys, records):
+                grouped.setdefault(key, []).append(record)
+
+            self._inconsistency_records = pd.DataFrame(
+                [(site, guideline, judgements) for (site, guideline), judgements in grouped.items()],
+                columns=['Case Study Title', 'Guideline', 'Judgements']
             )
+        return self._inconsistency_records
 
-            processed_dfs['SItes by Deviation'] = inconsistency_records
-    else:
-        print("⚠️ Missing columns for deviation analysis.")
-
-    return processed_dfs
-
-
-
-
-
+    def _judgment_inconsistencies(self):
+        return self._inconsistencies().copy()
 
+    def _sites_by_deviation(self):
+        return self._inconsistencies().rename(columns={'Guideline': 'guideline'})
 
 
+def get_report_engine(df: pd.DataFrame) -> ReportEngine:
+    """Returns the ReportEngine for this dataset, so masks are shared between reports built at different times."""
+    return cached_for_frame(df, "report_engine", ReportEngine)
 
 
+def process_datasets(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Processes the uploaded dataset to generate specific filtered subsets (the input frame is left untouched)."""
+    return ReportEngine(df).build_all()
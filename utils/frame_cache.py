@@ -0,0 +1,30 @@
+# utils/frame_cache.py
+
+import weakref
+
+# id(df) -> (weak reference to df, {name: derived value})
+_entries = {}
+
+
+def cached_for_frame(df, name: str, builder):
+    """
+    Returns builder(df), computing it once per DataFrame object and name.
+
+    Derived structures (indexes, normalized views, ...) live as long as the frame they
+    were built from and are dropped with it. The frames stored in session state are
+    treated as read-only, so an entry never needs invalidating while its frame lives.
+    """
+    key = id(df)
+    entry = _entries.get(key)
+    if entry is None or entry[0]() is not df:
+        def _forget(ref, key=key):
+            if _entries.get(key, (None,))[0] is ref:
+                del _entries[key]
+
+        entry = (weakref.ref(df, _forget), {})
+        _entries[key] = entry
+
+    values = entry[1]
+    if name not in values:
+        values[name] = builder(df)
+    return values[name]
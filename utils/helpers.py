@@ -1,18 +1,44 @@
+import numpy as np
 import pandas as pd
 
 
+# Single judgement palette shared by the pills chart, the Overview table and the detail page.
+JUDGMENT_COLORS = {
+    'adhered_high': '#769b37',
+    'adhered_low': '#a1b145',
+    'violated_high': '#b42625',
+    'violated_low': '#ea7a0d',
+    'not_applicable': '#9c9c9c',
+    'neutral': '#ffc302',
+    'issue_resolved': '#0273ff',
+    'not_rated': 'rgba(255,255,255,0.3)'
+}
+DEFAULT_JUDGMENT_COLOR = '#FFFFFF'
+
+
 def get_judgment_color(judgment):
     if pd.isna(judgment):
-        return '#FFFFFF'
-    color_map = {
-        'adhered_high': '#769b37',
-        'adhered_low': '#a1b145',
-        'violated_high': '#b42625',
-        'violated_low': '#ea7a0d',
-        'not_applicable': '#9c9c9c',
-        'neutral': '#ffc302',
-        'issue_resolved': '#0273ff',
-        'not_rated': 'rgb(255,255,255, 0.3)'
-    }
+        return DEFAULT_JUDGMENT_COLOR
     judgment_str = str(judgment).lower().strip()
-    return color_map.get(judgment_str, '#FFFFFF')
\ No newline at end of file
+    return JUDGMENT_COLORS.get(judgment_str, DEFAULT_JUDGMENT_COLOR)
+
+
+def judgment_palette(judgments: pd.Series, missing_color: str = DEFAULT_JUDGMENT_COLOR):
+    """
+    Returns (codes, palette): one palette entry per judgement category plus a trailing
+    `missing_color` entry, and each row's index into that palette.
+    """
+    categorical = judgments if isinstance(judgments.dtype, pd.CategoricalDtype) else judgments.astype("category")
+    palette = np.array(
+        [get_judgment_color(category) for category in categorical.cat.categories] + [missing_color],
+        dtype=object
+    )
+    codes = categorical.cat.codes.to_numpy().astype(np.int64)
+    codes[codes < 0] = len(palette) - 1
+    return codes, palette
+
+
+def judgment_color_array(judgments: pd.Series, missing_color: str = DEFAULT_JUDGMENT_COLOR) -> np.ndarray:
+    """Vectorized get_judgment_color: one palette lookup per category, then a take over the codes."""
+    codes, palette = judgment_palette(judgments, missing_color)
+    return palette[codes]
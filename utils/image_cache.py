@@ -0,0 +1,207 @@
+# utils/image_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+IMAGE_CACHE_FOLDER = "image_cache"
+# Total size of cached originals and thumbnails; least recently used images are evicted past it.
+IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Entries younger than this are served without contacting the server at all;
+# older ones are revalidated with a conditional request (ETag / Last-Modified).
+FRESH_SECONDS = 24 * 60 * 60
+
+# Thumbnails are drawn at 60px; twice that keeps them sharp on high-DPI screens.
+THUMBNAIL_SIZE = (120, 120)
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+THUMBNAIL_EXTENSION = ".webp" if THUMBNAIL_FORMAT == "WEBP" else ".jpg"
+# Streamlit downscales (i.e. fully decodes) any image wider than its content area on every
+# render; wider originals get a display copy at this width once, when they are cached.
+DISPLAY_MAX_WIDTH = 1460
+
+# `path` is the copy to display (the original unless it was wider than DISPLAY_MAX_WIDTH).
+CachedImage = namedtuple(
+    "CachedImage", ["url", "path", "thumbnail_path", "content_type", "etag", "last_modified", "fetched_at"]
+)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomically(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _encode(image, image_format, **params) -> bytes:
+    out = BytesIO()
+    image.save(out, image_format, **params)
+    return out.getvalue()
+
+
+def make_renditions(content: bytes):
+    """
+    Decodes the image once and returns (thumbnail, display copy or None): a small WebP
+    (or JPEG) preview, plus a copy at DISPLAY_MAX_WIDTH when the original is wider.
+    """
+    with Image.open(BytesIO(content)) as image:
+        source_format = image.format
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        display = None
+        if image.width > DISPLAY_MAX_WIDTH:
+            height = round(image.height * DISPLAY_MAX_WIDTH / image.width)
+            display_format = "JPEG" if source_format == "JPEG" else "PNG"
+            resized = image.resize((DISPLAY_MAX_WIDTH, height), Image.LANCZOS)
+            display = _encode(resized.convert("RGB") if display_format == "JPEG" else resized, display_format, quality=90)
+            image = resized
+
+        image.thumbnail(THUMBNAIL_SIZE)
+        if THUMBNAIL_FORMAT == "JPEG" and image.mode == "RGBA":
+            image = image.convert("RGB")
+        return _encode(image, THUMBNAIL_FORMAT, quality=80), display
+
+
+class ImageCache:
+    """
+    Content-addressed disk cache of fetched images and their thumbnails.
+
+    Originals live under blobs/<sha256 of content> and their thumbnails (and display
+    copies of very wide images) under thumbs/<same hash>, so URLs serving identical
+    bytes share one copy. A small
+    JSON record per URL (meta/<sha256 of url>.json) maps it to its blob together
+    with the validators needed for conditional revalidation. Every hit bumps the
+    blob's mtime, and eviction removes the oldest blobs first.
+    """
+
+    def __init__(self, folder: str = IMAGE_CACHE_FOLDER, max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+                 fresh_seconds: int = FRESH_SECONDS):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        for sub in ("blobs", "thumbs", "meta"):
+            os.makedirs(os.path.join(folder, sub), exist_ok=True)
+        self._total_bytes = sum(
+            entry.stat().st_size
+            for sub in ("blobs", "thumbs")
+            for entry in os.scandir(os.path.join(folder, sub))
+            if not entry.name.endswith(".tmp")
+        )
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.folder, "meta", f"{_sha256(url.encode())}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.folder, "blobs", digest)
+
+    def _thumbnail_path(self, digest: str) -> str:
+        return os.path.join(self.folder, "thumbs", digest + THUMBNAIL_EXTENSION)
+
+    def _display_path(self, digest: str) -> str:
+        return os.path.join(self.folder, "thumbs", digest + "-display")
+
+    def get(self, url: str):
+        """Returns the URL's CachedImage (fresh or stale), or None if it is not cached."""
+        try:
+            with open(self._meta_path(url)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        digest = meta["digest"]
+        path, thumbnail_path = self._blob_path(digest), self._thumbnail_path(digest)
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+            os.utime(thumbnail_path, (now, now))
+        except OSError:
+            return None  # Evicted: the record is dangling.
+        display_path = self._display_path(digest)
+        if os.path.exists(display_path):
+            path = display_path
+        return CachedImage(url, path, thumbnail_path, meta["content_type"],
+                           meta.get("etag"), meta.get("last_modified"), meta["fetched_at"])
+
+    def is_fresh(self, entry: CachedImage) -> bool:
+        return time.time() - entry.fetched_at < self.fresh_seconds
+
+    def validators(self, entry: CachedImage) -> dict:
+        """Conditional request headers for revalidating a stale entry."""
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _write_meta(self, url, digest, content_type, etag, last_modified) -> None:
+        meta = {
+            "url": url,
+            "digest": digest,
+            "content_type": content_type,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        _write_atomically(self._meta_path(url), json.dumps(meta).encode())
+
+    def refresh(self, entry: CachedImage, etag: str = None, last_modified: str = None) -> CachedImage:
+        """Marks a stale entry fresh again after the server answered 304 Not Modified."""
+        digest = os.path.basename(entry.thumbnail_path)[:-len(THUMBNAIL_EXTENSION)]
+        self._write_meta(entry.url, digest, entry.content_type, etag or entry.etag, last_modified or entry.last_modified)
+        return self.get(entry.url)
+
+    def put(self, url: str, content: bytes, content_type: str, etag: str = None,
+            last_modified: str = None) -> CachedImage:
+        """Stores a downloaded image and its thumbnail, then evicts down to the size cap."""
+        digest = _sha256(content)
+        path, thumbnail_path = self._blob_path(digest), self._thumbnail_path(digest)
+        if not (os.path.exists(path) and os.path.exists(thumbnail_path)):
+            thumbnail, display = make_renditions(content)  # raises on undecodable content, before anything is written
+            _write_atomically(path, content)
+            _write_atomically(thumbnail_path, thumbnail)
+            written = len(content) + len(thumbnail)
+            if display is not None:
+                _write_atomically(self._display_path(digest), display)
+                written += len(display)
+            with self._lock:
+                self._total_bytes += written
+        self._write_meta(url, digest, content_type, etag, last_modified)
+        entry = self.get(url)
+        self.evict()
+        return entry
+
+    def evict(self) -> None:
+        """Removes least recently used images (original and renditions together) until under the cap."""
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            blobs = sorted(
+                (entry for entry in os.scandir(os.path.join(self.folder, "blobs")) if not entry.name.endswith(".tmp")),
+                key=lambda entry: entry.stat().st_mtime
+            )
+            for blob in blobs:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                for path in (blob.path, self._thumbnail_path(blob.name), self._display_path(blob.name)):
+                    try:
+                        size = os.path.getsize(path)
+                        os.remove(path)
+                        self._total_bytes -= size
+                    except OSError:
+                        pass
+
+    def stats(self) -> dict:
+        return {"bytes": self._total_bytes, "max_bytes": self.max_bytes}
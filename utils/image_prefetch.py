@@ -0,0 +1,166 @@
+# utils/image_prefetch.py
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils.image_service import fetch_image, split_image_urls
+
+# Guidelines warmed per filter combination, in likely-click order.
+PREFETCH_GUIDELINES = 200
+PREFETCH_WORKERS = 3
+# Upper bound on prefetch requests started per second, across all workers.
+PREFETCH_RATE = 8.0
+
+# Judgements shown first: violations are what reviewers usually open.
+PRIORITY_JUDGEMENTS = ('violated_high', 'violated_low')
+
+
+def _sort_keys(df: pd.DataFrame, positions: np.ndarray):
+    """(violated, impact) of the given rows; missing Impact sorts last."""
+    if 'Judgement' in df.columns and isinstance(df['Judgement'].dtype, pd.CategoricalDtype):
+        # Compare the integer codes instead of the labels.
+        codes = df['Judgement'].cat.codes.to_numpy()[positions]
+        priority = df['Judgement'].cat.categories.isin(PRIORITY_JUDGEMENTS)
+        violated = (codes >= 0) & priority[codes]  # code -1 is a missing judgement
+    elif 'Judgement' in df.columns:
+        violated = df['Judgement'].isin(PRIORITY_JUDGEMENTS).to_numpy()[positions]
+    else:
+        violated = np.zeros(len(positions), bool)
+    if 'Impact' in df.columns:
+        impact = df['Impact'].to_numpy(dtype=np.float64, na_value=np.nan)[positions]
+        impact = np.where(np.isnan(impact), -np.inf, impact)
+    else:
+        impact = np.zeros(len(positions))
+    return violated, impact
+
+
+def _top_by_impact(positions: np.ndarray, impact: np.ndarray, k: int) -> np.ndarray:
+    """The k positions a stable sort by descending impact would put first (ties keep position order)."""
+    if k >= len(positions):
+        return positions
+    if k <= 0:
+        return positions[:0]
+    cutoff = np.partition(-impact, k - 1)[k - 1]
+    above = -impact < cutoff
+    tied = np.flatnonzero(-impact == cutoff)[:k - int(above.sum())]
+    keep = above
+    keep[tied] = True
+    return positions[keep]
+
+
+def prefetch_order(df: pd.DataFrame, positions: np.ndarray = None, limit: int = None) -> np.ndarray:
+    """
+    Row positions (all rows, or the given ascending `positions`) ordered by likely click:
+    violated guidelines first, then by descending Impact. With `limit`, only the first
+    `limit` of that order are selected and sorted, which avoids sorting the whole frame.
+    """
+    positions = np.arange(len(df)) if positions is None else np.asarray(positions)
+    violated, impact = _sort_keys(df, positions)
+    if limit is not None and limit < len(positions):
+        first = _top_by_impact(positions[violated], impact[violated], limit)
+        rest = _top_by_impact(positions[~violated], impact[~violated], limit - len(first))
+        chosen = np.concatenate([first, rest])
+        chosen.sort()
+        violated, impact = _sort_keys(df, chosen)
+        positions = chosen
+    # lexsort sorts by the last key first.
+    return positions[np.lexsort((-impact, ~violated))]
+
+
+def prefetch_urls(df: pd.DataFrame, limit: int = PREFETCH_GUIDELINES) -> list:
+    """Distinct screenshot URLs of the `limit` most likely clicked guidelines, in priority order."""
+    if 'Image URLs' not in df.columns or df.empty:
+        return []
+    with_images = np.flatnonzero(df['Image URLs'].notna().to_numpy())
+    cells = df['Image URLs'].to_numpy()
+    urls = {}
+    for i in prefetch_order(df, with_images, limit):
+        urls.update(dict.fromkeys(split_image_urls(cells[i])))
+    return list(urls)
+
+
+class ImagePrefetcher:
+    """
+    Warms the image cache in the background for the guidelines on screen.
+
+    A few daemon workers drain a queue of URLs at no more than PREFETCH_RATE requests
+    per second, each through image_service.fetch_image (so cached images are skipped
+    and anything the detail page is already loading is shared). Scheduling a new
+    filter combination replaces whatever is still queued from the previous one; its
+    URLs are collected by a worker, so scheduling costs the script thread nothing.
+    """
+
+    def __init__(self, workers: int = PREFETCH_WORKERS, rate: float = PREFETCH_RATE):
+        self.interval = 1.0 / rate
+        self._queue = deque()
+        self._key = None
+        self._pending = None  # (key, frame) whose URLs a worker still has to collect
+        self._next_start = 0.0
+        self._condition = threading.Condition()
+        self.completed = 0
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"image-prefetch-{i}", daemon=True).start()
+
+    def schedule(self, key, df: pd.DataFrame) -> None:
+        """Queues the frame's screenshots, unless `key` (dataset + filters) is already scheduled."""
+        with self._condition:
+            if key == self._key:
+                return
+            self._key = key
+            self._pending = (key, df)
+            self._queue.clear()
+            self._condition.notify_all()
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def _take(self) -> str:
+        """Blocks until a URL is queued and the rate limit allows starting it."""
+        with self._condition:
+            while not self._queue:
+                if self._pending is not None:
+                    key, df = self._pending
+                    self._pending = None
+                    self._condition.release()
+                    try:
+                        urls = prefetch_urls(df)
+                    finally:
+                        self._condition.acquire()
+                    if key == self._key:  # not superseded while the URLs were being collected
+                        self._queue.extend(urls)
+                        self._condition.notify_all()
+                    continue
+                self._condition.wait()
+            url = self._queue.popleft()
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+        return url
+
+    def _work(self) -> None:
+        while True:
+            url = self._take()
+            try:
+                fetch_image(url).result()
+            except Exception:
+                pass  # failures are already recorded as ImageResults; never kill the worker
+            self.completed += 1
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> ImagePrefetcher:
+    """The process-wide prefetcher, started on first use."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = ImagePrefetcher()
+        return _prefetcher
@@ -0,0 +1,133 @@
+# utils/image_service.py
+
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, Future
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.image_cache import ImageCache
+
+# Connections kept open per host; screenshots usually come from one or two CDNs.
+POOL_SIZE = 16
+MAX_WORKERS = 8
+# (connect, read) seconds.
+REQUEST_TIMEOUT = (3.05, 10)
+# Failed URLs are not retried for this long, so reopening a guideline with broken links stays offline.
+FAILURE_TTL_SECONDS = 5 * 60
+
+# `path` and `thumbnail_path` point into the disk cache; st.image serves them without decoding.
+ImageResult = namedtuple("ImageResult", ["url", "ok", "path", "thumbnail_path", "content_type", "error"])
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("HEAD", "GET"))
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = _build_session()
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="image-fetch")
+_in_flight = {}
+_failures = TTLCache(maxsize=1024, ttl=FAILURE_TTL_SECONDS)
+_lock = threading.RLock()  # re-entered when a done-callback runs inline
+_cache = None
+
+
+def get_image_cache() -> ImageCache:
+    """The shared disk cache, created on first use."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = ImageCache()
+        return _cache
+
+
+def split_image_urls(raw) -> list:
+    """Turns an 'Image URLs' cell (comma-separated string, list or scalar) into distinct URLs, in order."""
+    if isinstance(raw, list):
+        urls = [str(url).strip() for url in raw]
+    elif isinstance(raw, str):
+        urls = [url.strip() for url in raw.split(',')]
+    elif raw is None or pd.isna(raw):
+        urls = []
+    else:
+        urls = [str(raw).strip()]
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+def _is_well_formed(url: str) -> bool:
+    parsed = urlparse(url)
+    return bool(parsed.scheme in ("http", "https") and parsed.netloc)
+
+
+def _cached_result(entry) -> ImageResult:
+    return ImageResult(entry.url, True, entry.path, entry.thumbnail_path, entry.content_type, None)
+
+
+def _fetch(url: str, stale=None) -> ImageResult:
+    """
+    Downloads one image into the disk cache, or revalidates a stale cached copy.
+    A single GET both validates and fetches it: the content type is checked on the
+    response headers before the body is read, so non-images cost no more than a HEAD.
+    """
+    if not _is_well_formed(url):
+        return ImageResult(url, False, None, None, None, "Malformed URL")
+    cache = get_image_cache()
+    try:
+        headers = cache.validators(stale) if stale is not None else {}
+        with _session.get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True) as response:
+            if response.status_code == 304 and stale is not None:
+                entry = cache.refresh(stale, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                return _cached_result(entry) if entry is not None else _fetch(url)
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "").lower()
+            if "image" not in content_type:
+                return ImageResult(url, False, None, None, content_type, f"Not an image ({content_type or 'unknown type'})")
+            content = response.content
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        # Storing decodes the image once to build its thumbnail, which also rejects corrupt files.
+        return _cached_result(cache.put(url, content, content_type, etag, last_modified))
+    except Exception as e:
+        return ImageResult(url, False, None, None, None, str(e))
+
+
+def _forget(url: str, future: Future) -> None:
+    with _lock:
+        _in_flight.pop(url, None)
+        if not future.result().ok:
+            _failures[url] = future.result()
+
+
+def fetch_image(url: str) -> Future:
+    """
+    Returns a Future resolving to the URL's ImageResult. Fresh disk-cache hits (and
+    recent failures) resolve immediately without touching the network; concurrent
+    requests for a URL share the fetch already in progress, so each URL is downloaded once.
+    """
+    entry = get_image_cache().get(url)
+    with _lock:
+        result = _cached_result(entry) if entry is not None and _cache.is_fresh(entry) else _failures.get(url)
+    if result is not None:
+        future = Future()
+        future.set_result(result)
+        return future
+    with _lock:
+        future = _in_flight.get(url)
+        if future is None:
+            future = _in_flight[url] = _executor.submit(_fetch, url, entry)
+            future.add_done_callback(lambda done, url=url: _forget(url, done))
+        return future
+
+
+def fetch_images(urls: list) -> dict:
+    """Starts fetching every URL concurrently; returns {future: position in urls}."""
+    return {fetch_image(url): i for i, url in enumerate(urls)}
@@ -0,0 +1,104 @@
+# utils/impact_cube.py
+
+import threading
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils.frame_cache import cached_for_frame
+from utils.schema import PLATFORM_NAMES
+
+# Dimensions of the cube; every Presentation chart and table groups by a subset of these.
+CUBE_DIMENSIONS = ['Case Study Title', 'platform', 'Catalog Theme Title', 'Catalog Topic Title', 'Judgement']
+
+
+def _platform(df: pd.DataFrame) -> pd.Series:
+    if "platform" in df.columns:
+        return df["platform"]
+    # Frames that did not go through apply_review_schema: derive it here, once per dataset.
+    codes = df["Citation Code: Platform-Specific"].astype(str).str.strip().str[-1].str.upper()
+    return codes.map(PLATFORM_NAMES).astype("category")
+
+
+class ImpactCube:
+    """
+    Impact aggregates over case study x platform x theme x topic x judgement.
+
+    Built once per dataset: one groupby keeps, per combination, the number of rows and
+    the count, sum and sum of squares of the non-missing Impact values. Any grouping by
+    a subset of the dimensions is then a roll-up of a few thousand cells instead of a
+    pass over every row, and mean and (sample) standard deviation follow from the sums.
+    Missing dimension values are kept as their own cells, so totals match the dataset.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        keys = {}
+        for dim in CUBE_DIMENSIONS:
+            if dim == "platform" and ("platform" in df.columns or "Citation Code: Platform-Specific" in df.columns):
+                keys[dim] = _platform(df)
+            elif dim in df.columns:
+                keys[dim] = df[dim]
+        self.dimensions = list(keys)
+
+        impact = (df["Impact"] if "Impact" in df.columns else pd.Series(np.nan, index=df.index)).astype("float64")
+        frame = pd.DataFrame({**keys, "impact": impact, "impact_sq": impact * impact})
+        grouped = frame.groupby(self.dimensions, observed=True, dropna=False, sort=True)
+        self.cells = pd.concat([
+            grouped.size().rename("rows"),
+            grouped["impact"].count().rename("count"),
+            grouped["impact"].sum().rename("sum"),
+            grouped["impact_sq"].sum().rename("sum_sq"),
+        ], axis=1).reset_index()
+        self._rollups = {}
+        self._lock = threading.Lock()
+
+    def covers(self, columns: List[str]) -> bool:
+        return all(col in self.dimensions for col in columns)
+
+    def rollup(self, by: List[str], where: Dict[str, object] = None) -> pd.DataFrame:
+        """
+        Aggregates grouped by `by` (rows with a missing key are left out, as in a groupby),
+        optionally restricted to cells where each `where` dimension equals the given value.
+        Columns: the keys, 'rows' (guidelines), 'count' (with an Impact), 'mean' and 'std'.
+        Results are memoized and shared between callers, so treat them as read-only.
+        """
+        key = (tuple(by), tuple(sorted((where or {}).items())))
+        with self._lock:
+            if key in self._rollups:
+                return self._rollups[key]
+        result = self._rollup(by, where)
+        with self._lock:
+            self._rollups[key] = result
+        return result
+
+    def _rollup(self, by: List[str], where: Dict[str, object] = None) -> pd.DataFrame:
+        cells = self.cells
+        for dim, value in (where or {}).items():
+            cells = cells[cells[dim] == value]
+        if by:
+            sums = cells.groupby(by, observed=True, sort=True)[["rows", "count", "sum", "sum_sq"]].sum().reset_index()
+        else:
+            sums = cells[["rows", "count", "sum", "sum_sq"]].sum().to_frame().T
+        sums = sums[sums["rows"] > 0].reset_index(drop=True)
+
+        count = sums["count"].astype("float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = sums["sum"] / count
+            variance = ((sums["sum_sq"] - sums["sum"] * mean) / (count - 1)).clip(lower=0)
+        sums["mean"] = mean.where(count > 0)
+        sums["std"] = np.sqrt(variance).where(count > 1)
+        return sums.drop(columns=["sum", "sum_sq"])
+
+    def platforms(self) -> List[str]:
+        """Platforms present in the dataset, in Desktop/Mobile/App order."""
+        if "platform" not in self.dimensions:
+            return []
+        present = set(self.rollup(["platform"])["platform"])
+        return [name for name in PLATFORM_NAMES.values() if name in present]
+
+
+def get_impact_cube(df: pd.DataFrame) -> ImpactCube:
+    """Returns the ImpactCube for this dataset, building it on first use."""
+    return cached_for_frame(df, "impact_cube", ImpactCube)
@@ -0,0 +1,150 @@
+# utils/link_audit.py
+
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+
+# Concurrent checks; the shared session keeps this many connections open per host.
+AUDIT_WORKERS = 48
+# (connect, read) seconds.
+AUDIT_TIMEOUT = (3.05, 10)
+# Link results are reused for this long, so re-running the audit only checks new URLs.
+AUDIT_TTL_SECONDS = 6 * 60 * 60
+AUDIT_CACHE_SIZE = 250_000
+
+# Fields audited, and whether their links must point at an image.
+AUDITED_FIELDS = {'Image URLs': True, 'Gemini URL': False}
+# Servers that reject HEAD are retried with a (streamed, unread) GET.
+HEAD_UNSUPPORTED = {403, 405, 501}
+
+REPORT_COLUMNS = [
+    'Citation Code: Platform-Specific', 'Case Study Title', 'Title', 'Field', 'URL', 'Status', 'Problem'
+]
+
+LinkStatus = namedtuple("LinkStatus", ["url", "ok", "status", "problem"])
+
+_results = TTLCache(maxsize=AUDIT_CACHE_SIZE, ttl=AUDIT_TTL_SECONDS)
+_results_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="link-audit")
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=AUDIT_WORKERS, pool_maxsize=AUDIT_WORKERS, max_retries=1)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = _build_session()
+
+
+def check_link(url: str, expect_image: bool, session: requests.Session = None) -> LinkStatus:
+    """HEADs the URL (falling back to GET) and reports whether it resolves, and to an image if expected."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return LinkStatus(url, False, None, "Malformed URL")
+    session = session or _session
+    try:
+        response = session.head(url, timeout=AUDIT_TIMEOUT, allow_redirects=True)
+        if response.status_code in HEAD_UNSUPPORTED:
+            with session.get(url, timeout=AUDIT_TIMEOUT, allow_redirects=True, stream=True) as get_response:
+                response = get_response
+        if response.status_code >= 400:
+            return LinkStatus(url, False, response.status_code, f"HTTP {response.status_code}")
+        content_type = response.headers.get("content-type", "").lower()
+        if expect_image and "image" not in content_type:
+            return LinkStatus(url, False, response.status_code, f"Not an image ({content_type or 'unknown type'})")
+        return LinkStatus(url, True, response.status_code, None)
+    except requests.Timeout:
+        return LinkStatus(url, False, None, "Timed out")
+    except requests.RequestException as e:
+        return LinkStatus(url, False, None, type(e).__name__)
+
+
+def audit_links(links, session: requests.Session = None, workers: int = AUDIT_WORKERS,
+                progress_callback=None) -> dict:
+    """
+    Checks (url, expect_image) pairs concurrently, reusing results checked within the
+    last AUDIT_TTL_SECONDS. Returns {(url, expect_image): LinkStatus}.
+    progress_callback(checked, total) is called as results come in.
+    """
+    links = list(dict.fromkeys(links))
+    statuses = {}
+    with _results_lock:
+        for link in links:
+            status = _results.get(link)
+            if status is not None:
+                statuses[link] = status
+    pending = [link for link in links if link not in statuses]
+
+    total = len(links)
+    if progress_callback:
+        progress_callback(len(statuses), total)
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="link-check") as pool:
+            futures = {pool.submit(check_link, url, expect_image, session): (url, expect_image)
+                       for url, expect_image in pending}
+            for future in as_completed(futures):
+                link = futures[future]
+                statuses[link] = future.result()
+                with _results_lock:
+                    _results[link] = statuses[link]
+                if progress_callback:
+                    progress_callback(len(statuses), total)
+    return statuses
+
+
+def collect_links(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per (guideline, field, URL) across the audited fields; comma-separated cells are split."""
+    frames = []
+    for field, expect_image in AUDITED_FIELDS.items():
+        if field not in df.columns:
+            continue
+        urls = df[field].dropna().astype(str).str.split(',').explode().str.strip()
+        urls = urls[urls != '']
+        frames.append(pd.DataFrame({'row': urls.index, 'Field': field, 'URL': urls.to_numpy(), 'expect_image': expect_image}))
+    if not frames:
+        return pd.DataFrame(columns=['row', 'Field', 'URL', 'expect_image'])
+    return pd.concat(frames, ignore_index=True).drop_duplicates(['row', 'Field', 'URL'])
+
+
+def build_broken_links_report(df: pd.DataFrame, session: requests.Session = None, progress_callback=None) -> pd.DataFrame:
+    """
+    "Broken Screenshots": every screenshot or Gemini link that does not resolve (or, for
+    screenshots, does not serve an image), one row per guideline and link. Each distinct
+    URL is checked once, however many guidelines share it.
+    """
+    links = collect_links(df)
+    statuses = audit_links(
+        zip(links['URL'], links['expect_image']), session=session, progress_callback=progress_callback
+    )
+    checked = [statuses[(url, expect_image)] for url, expect_image in zip(links['URL'], links['expect_image'])]
+    broken = links[[not status.ok for status in checked]]
+    problems = [status for status in checked if not status.ok]
+
+    info_columns = [col for col in REPORT_COLUMNS[:3] if col in df.columns]
+    report = df.loc[broken['row'], info_columns].reset_index(drop=True)
+    report['Field'] = broken['Field'].to_numpy()
+    report['URL'] = broken['URL'].to_numpy()
+    report['Status'] = pd.array([status.status for status in problems], dtype="Int64")
+    report['Problem'] = [status.problem for status in problems]
+    return report
+
+
+class LinkAuditJob:
+    """A Broken Screenshots report being built in the background, with its progress."""
+
+    def __init__(self, df: pd.DataFrame, session: requests.Session = None):
+        self.checked = 0
+        self.total = 0
+        self.future = _executor.submit(build_broken_links_report, df, session, self._progress)
+
+    def _progress(self, checked: int, total: int) -> None:
+        self.checked, self.total = checked, total
@@ -0,0 +1,78 @@
+# utils/schema.py
+
+import pandas as pd
+
+# Bump whenever the typed layout below changes, so stale snapshots are not reused.
+SCHEMA_VERSION = 1
+
+# Low-cardinality text columns stored as categoricals (integer codes + one copy of each label).
+CATEGORICAL_COLUMNS = [
+    "Review Title",
+    "Case Study Title",
+    "Catalog Theme Title",
+    "Catalog Topic Title",
+    "Judgement",
+    "Estimated Cost",
+    "Implementation Status",
+]
+
+# Text columns of the schema (the categoricals plus free text); streamed chunks read exactly
+# these as strings, everything else is inferred as pd.read_csv would.
+TEXT_COLUMNS = CATEGORICAL_COLUMNS + ["Title", "Citation Code: Platform-Specific"]
+
+# Yes/no flags exported as TRUE/FALSE (or blank) by the review tool.
+FLAG_COLUMNS = ["Is Nudged?", "Is Manual Judgement?", "Needs Discussion?"]
+
+# Last character of 'Citation Code: Platform-Specific' -> platform name.
+PLATFORM_NAMES = {"D": "Desktop", "M": "Mobile", "A": "App"}
+# Lowercase platform argument (as used by the agent tools) -> platform name.
+PLATFORM_LOOKUP = {name.lower(): name for name in PLATFORM_NAMES.values()}
+
+# Columns added by apply_review_schema (not part of the uploaded export).
+DERIVED_COLUMNS = ["platform", "guideline_base"]
+
+_TRUE_VALUES = {"true", "1", "1.0", "yes", "y", "t"}
+_FALSE_VALUES = {"false", "0", "0.0", "no", "n", "f"}
+
+
+def parse_flag_column(series: pd.Series) -> pd.Series:
+    """Parses a TRUE/FALSE-style column into the nullable 'boolean' dtype (blank -> <NA>)."""
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype("boolean")
+    normalized = series.astype("string").str.strip().str.lower()
+    parsed = pd.Series(pd.NA, index=series.index, dtype="boolean")
+    parsed[normalized.isin(_TRUE_VALUES).fillna(False)] = True
+    parsed[normalized.isin(_FALSE_VALUES).fillna(False)] = False
+    return parsed
+
+
+def apply_review_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the declared review schema to a cleaned frame:
+      - categoricals for the low-cardinality text columns,
+      - float32 'Impact' (non-numeric values become NaN),
+      - nullable boolean flags,
+      - derived 'platform' (Desktop/Mobile/App) and 'guideline_base' (citation without platform letter).
+    """
+    df = df.copy()
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    if "Impact" in df.columns:
+        df["Impact"] = pd.to_numeric(df["Impact"], errors="coerce").astype("float32")
+
+    for col in FLAG_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_flag_column(df[col])
+
+    if "Citation Code: Platform-Specific" in df.columns:
+        citation = df["Citation Code: Platform-Specific"].astype(str).str.strip()
+        df["platform"] = pd.Categorical(
+            citation.str[-1].str.upper().map(PLATFORM_NAMES),
+            categories=list(PLATFORM_NAMES.values())
+        )
+        df["guideline_base"] = citation.str[:-1].astype("category")
+
+    return df
@@ -0,0 +1,125 @@
+# utils/search_index.py
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils.frame_cache import cached_for_frame
+
+# Fields searched by the Overview search box; the agent's search_guideline tool uses a subset.
+SEARCH_FIELDS = ['Title', 'Citation Code: Platform-Specific', 'Catalog Theme Title', 'Catalog Topic Title']
+
+NGRAM_SIZE = 3
+QUERY_CACHE_SIZE = 256
+# Above this many matching values, rows are found through the codes array instead of per-value slices.
+DIRECT_EXPANSION_LIMIT = 64
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class _FieldIndex:
+    """Trigram index over the distinct values of one column, plus the rows holding each value."""
+
+    def __init__(self, series: pd.Series):
+        categorical = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+        self.values = [str(value).lower() for value in categorical.cat.categories]
+
+        codes = categorical.cat.codes.to_numpy()
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        self._codes = codes
+        self._rows = order
+        self._offsets = np.concatenate(([0], np.cumsum(counts))) + np.count_nonzero(codes < 0)
+
+        postings: Dict[str, List[int]] = {}
+        for value_id, value in enumerate(self.values):
+            for gram in _ngrams(value):
+                postings.setdefault(gram, []).append(value_id)
+        self.postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    def matching_values(self, term: str, prefix: bool = False) -> np.ndarray:
+        """Ids of the distinct values containing (or, with prefix=True, starting with) the lowercase term."""
+        if len(term) < NGRAM_SIZE:
+            candidates = range(len(self.values))
+        else:
+            lists = []
+            for gram in _ngrams(term):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    return np.empty(0, dtype=np.int64)
+                lists.append(posting)
+            lists.sort(key=len)
+            candidates = lists[0]
+            for posting in lists[1:]:
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+
+        # Trigrams only narrow the candidates; confirm the actual substring/prefix.
+        if prefix:
+            return np.array([i for i in candidates if self.values[i].startswith(term)], dtype=np.int64)
+        return np.array([i for i in candidates if term in self.values[i]], dtype=np.int64)
+
+    def mark_rows(self, value_ids: np.ndarray, row_mask: np.ndarray) -> None:
+        """Sets row_mask to True on every row holding one of the given values."""
+        if len(value_ids) <= DIRECT_EXPANSION_LIMIT:
+            for i in value_ids:
+                row_mask[self._rows[self._offsets[i]:self._offsets[i + 1]]] = True
+        else:
+            # Many matching values: one vectorized lookup over the codes beats per-value slices.
+            # The extra trailing slot absorbs missing values (code -1).
+            hit = np.zeros(len(self.values) + 1, dtype=bool)
+            hit[value_ids] = True
+            row_mask |= hit[self._codes]
+
+
+class SearchIndex:
+    """
+    Case-insensitive substring/prefix search over the guideline text fields.
+
+    Built once per dataset. A query is answered by intersecting trigram posting lists
+    over each field's distinct values (titles and themes repeat across case studies,
+    so there are far fewer values than rows), then marking the matching rows in a bitmap.
+    Search terms are matched literally, not as regular expressions.
+    """
+
+    def __init__(self, df: pd.DataFrame, fields: List[str] = None):
+        self.n_rows = len(df)
+        self.fields = {
+            field: _FieldIndex(df[field])
+            for field in (fields or SEARCH_FIELDS)
+            if field in df.columns
+        }
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()  # the agent runs searches on several threads
+
+    def search(self, term: str, fields: List[str] = None, prefix: bool = False) -> np.ndarray:
+        """Returns the ascending row positions where any of `fields` matches `term`."""
+        term = (term or "").strip().lower()
+        fields = tuple(field for field in (fields or self.fields) if field in self.fields)
+        key = (term, fields, prefix)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        row_mask = np.zeros(self.n_rows, dtype=bool)
+        for field in fields:
+            index = self.fields[field]
+            index.mark_rows(index.matching_values(term, prefix=prefix), row_mask)
+        positions = np.flatnonzero(row_mask)
+        positions.flags.writeable = False  # shared between callers through the cache
+
+        with self._lock:
+            self._cache[key] = positions
+            if len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return positions
+
+
+def get_search_index(df: pd.DataFrame) -> SearchIndex:
+    """Returns the SearchIndex for this dataset, building it on first use."""
+    return cached_for_frame(df, "search_index", SearchIndex)
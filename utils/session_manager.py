@@ -1,8 +1,26 @@
 import os
+import re
+import time
+import shutil
+import hashlib
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
 
+from utils.schema import SCHEMA_VERSION, TEXT_COLUMNS, apply_review_schema
+
 UPLOAD_FOLDER = "uploaded_files"
+SNAPSHOT_FOLDER = "snapshots"
+
+# Uploads at least this large are ingested chunk by chunk (see ingest_csv_streaming).
+STREAMING_THRESHOLD_BYTES = 100 * 1024 * 1024
+CHUNK_SIZE = 50_000
+
+PLATFORM_CITATION_PATTERN = re.compile(r"#289[DMA]")
+
+# (path, size, mtime) -> content hash, so repeated loads of the same upload skip re-hashing.
+_file_hash_cache = {}
 
 def save_uploaded_file(uploaded_file):
     """Saves uploaded file to a designated folder and returns its path."""
@@ -10,32 +28,114 @@ def save_uploaded_file(uploaded_file):
         os.makedirs(UPLOAD_FOLDER)
     
     file_path = os.path.join(UPLOAD_FOLDER, uploaded_file.name)
+    uploaded_file.seek(0)
     with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+        shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
     
     return file_path
 
 
-def load_csv(file_path: str) -> pd.DataFrame:
-    """Load and clean CSV file **before any other processing**."""
+def compute_file_hash(file_path: str) -> str:
+    """Returns the SHA-256 of the file contents, memoized on path, size and mtime."""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hash_cache:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        _file_hash_cache[key] = digest.hexdigest()
+    return _file_hash_cache[key]
+
+
+def snapshot_path(file_hash: str) -> str:
+    """Path of the columnar snapshot for a CSV with the given content hash (and schema version)."""
+    return os.path.join(SNAPSHOT_FOLDER, f"{file_hash}-s{SCHEMA_VERSION}.parquet")
+
+
+def read_snapshot(path: str) -> pd.DataFrame:
+    """
+    Reads a Parquet snapshot through a memory map instead of a buffered copy.
+    Columns that are null in every row (per the row-group statistics, or never typed
+    while streaming) are skipped, which is how streamed snapshots get the "drop
+    completely empty columns" rule.
+    """
+    metadata = pq.ParquetFile(path, memory_map=True).metadata
+    null_counts = {}
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            nulls = column.statistics.null_count if column.statistics is not None and column.statistics.has_null_count else 0
+            null_counts[column.path_in_schema] = null_counts.get(column.path_in_schema, 0) + nulls
+
+    arrow_schema = metadata.schema.to_arrow_schema()
+    columns = [
+        name for name in arrow_schema.names
+        if null_counts.get(name, 0) < metadata.num_rows and not pa.types.is_null(arrow_schema.field(name).type)
+    ]
+    return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def write_snapshot(df: pd.DataFrame, path: str) -> None:
+    """Writes the cleaned frame as a Parquet snapshot (atomically, via a temp file)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
     try:
-        df = pd.read_csv(file_path)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # A snapshot is only an accelerator; a CSV that Arrow can't type is still usable.
+        print(f"Could not write snapshot {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 
-        # 🔹 **Standardize Column Names (Remove Extra Spaces)**
-        df.columns = df.columns.str.strip()
+def clean_dataframe(df: pd.DataFrame, drop_empty_columns: bool = True) -> pd.DataFrame:
+    """
+    Applies the ingest cleaning rules to a freshly parsed frame.
+    Streamed chunks pass drop_empty_columns=False: a column can only be judged empty across the whole file.
+    """
+    # 🔹 **Standardize Column Names (Remove Extra Spaces)**
+    df.columns = df.columns.str.strip()
 
-        # 🔹 **Drop Completely Empty Columns**
+    # 🔹 **Drop Completely Empty Columns**
+    if drop_empty_columns:
         df.dropna(axis=1, how="all", inplace=True)
 
-        # 🔹 **Drop Rows Where Key Fields Are Empty**
-        df.dropna(subset=['Case Study Title', 'Title', 'Catalog Theme Title'], how='any', inplace=True)
+    # 🔹 **Drop Rows Where Key Fields Are Empty**
+    df.dropna(subset=['Case Study Title', 'Title', 'Catalog Theme Title'], how='any', inplace=True)
 
-        # 🔹 **Drop Rows Where 'Citation Code: Platform-Specific' Is NaN or Empty**
-        df.dropna(subset=['Citation Code: Platform-Specific'], inplace=True)
+    # 🔹 **Drop Rows Where 'Citation Code: Platform-Specific' Is NaN or Empty**
+    df.dropna(subset=['Citation Code: Platform-Specific'], inplace=True)
 
-        # 🔹 **Remove Empty Strings in 'Citation Code: Platform-Specific'**
-        df = df[df['Citation Code: Platform-Specific'].astype(str).str.strip() != ""]
+    # 🔹 **Remove Empty Strings in 'Citation Code: Platform-Specific'**
+    df = df[df['Citation Code: Platform-Specific'].astype(str).str.strip() != ""]
 
+    # Row labels double as row positions for everything built on top of the frame.
+    return df.reset_index(drop=True)
+
+
+def load_csv(file_path: str) -> pd.DataFrame:
+    """
+    Load and clean CSV file **before any other processing**.
+
+    The cleaned frame is typed with the review schema (see utils/schema.py). The first
+    clean load of a given file content is written to a Parquet snapshot keyed by the
+    file's SHA-256; later loads of the same content are served from that snapshot
+    instead of re-parsing the CSV.
+    """
+    try:
+        path = snapshot_path(compute_file_hash(file_path))
+        if os.path.exists(path):
+            try:
+                return read_snapshot(path)
+            except Exception as e:
+                print(f"Ignoring unreadable snapshot {path}: {e}")
+
+        df = apply_review_schema(clean_dataframe(pd.read_csv(file_path)))
+        write_snapshot(df, path)
         return df
         
     except Exception as e:
@@ -43,6 +143,160 @@ def load_csv(file_path: str) -> pd.DataFrame:
         return None
 
 
+def _column_type(current, series: pd.Series) -> pa.DataType:
+    """Arrow type holding both the values written so far (typed `current`) and this chunk's `series`."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        incoming = pa.dictionary(pa.int32(), pa.string())
+    elif dtype == "float32":
+        incoming = pa.float32()
+    elif dtype in ("boolean", "bool"):
+        incoming = pa.bool_()
+    elif series.isna().all():
+        # Sparse columns (comments, URLs) are often blank for whole chunks: decide once values show up.
+        incoming = pa.null()
+    elif pd.api.types.is_integer_dtype(dtype):
+        incoming = pa.int64()
+    elif pd.api.types.is_float_dtype(dtype):
+        incoming = pa.float64()
+    else:
+        incoming = pa.string()
+
+    if current is None or pa.types.is_null(current):
+        return incoming
+    if incoming == current or pa.types.is_null(incoming):
+        return current
+    if pa.types.is_integer(current) and pa.types.is_floating(incoming):
+        # Nullable in Arrow: whole numbers with gaps still fit, and read back as float like read_csv
+        values = series.dropna()
+        return current if (values == values.round()).all() else pa.float64()
+    if pa.types.is_floating(current) and pa.types.is_integer(incoming):
+        return current
+    return pa.string()
+
+
+def _arrow_schema_for(df: pd.DataFrame, schema: pa.Schema = None) -> pa.Schema:
+    """Arrow schema for a streamed chunk that also holds every chunk written under `schema` before it."""
+    return pa.schema([
+        pa.field(col, _column_type(schema.field(col).type if schema is not None else None, df[col]))
+        for col in df.columns
+    ])
+
+
+def _conform_chunk(df: pd.DataFrame, schema: pa.Schema) -> pd.DataFrame:
+    """Adjusts the chunk's columns so pa.Table.from_pandas accepts them under `schema`."""
+    for field in schema:
+        series = df[field.name]
+        if pa.types.is_null(field.type):
+            df[field.name] = pd.Series(None, index=df.index, dtype=object)
+        elif pa.types.is_string(field.type) and series.notna().any():
+            if series.dtype == object:
+                df[field.name] = series.where(series.isna(), series.astype(str))
+            else:
+                # Numbers in a text column: spelled the way Arrow casts the rows written before.
+                text = pa.array(series, from_pandas=True).cast(pa.string())
+                df[field.name] = pd.Series(text.to_numpy(zero_copy_only=False), index=df.index, dtype=object)
+    return df
+
+
+def ingest_csv_streaming(file_path: str, chunksize: int = CHUNK_SIZE, progress_callback=None) -> pd.DataFrame:
+    """
+    Streaming variant of load_csv for very large exports.
+
+    Reads the CSV in chunks of `chunksize` rows, cleans and types each chunk, validates
+    its '#289[DMA]' citations, and appends it straight to the same Parquet snapshot
+    load_csv uses. Only one raw chunk is held in memory at a time; the returned frame
+    is read back from the finished (typed, categorical) snapshot, with the citation
+    count in df.attrs["citation_matches"] so validate_csv need not scan it again.
+
+    The schema's text columns are read as strings; other columns are inferred per
+    chunk like pd.read_csv does. A column stays untyped while it is blank, and when a
+    later chunk needs a wider type than the one written so far (int -> float -> text),
+    the rows already in the snapshot are rewritten with it.
+
+    progress_callback, if given, is called after every chunk with a dict holding
+    'rows_read', 'rows_kept', 'citation_matches', 'invalid_chunks' (chunks with rows
+    but no valid citation), 'rows_per_second' and 'fraction' (share of the file's
+    bytes consumed so far).
+    """
+    tmp_path = None
+    try:
+        path = snapshot_path(compute_file_hash(file_path))
+        if os.path.exists(path):
+            try:
+                return read_snapshot(path)
+            except Exception as e:
+                print(f"Ignoring unreadable snapshot {path}: {e}")
+
+        os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        total_bytes = max(os.path.getsize(file_path), 1)
+        started = time.perf_counter()
+        rows_read = rows_kept = citation_matches = invalid_chunks = 0
+        schema = None
+        writer = None
+
+        # Header names as written in the file (clean_dataframe strips them later).
+        header = pd.read_csv(file_path, nrows=0).columns
+        text_dtypes = {col: str for col in header if col.strip() in TEXT_COLUMNS}
+
+        try:
+            with open(file_path, "rb") as f:
+                for chunk in pd.read_csv(f, chunksize=chunksize, dtype=text_dtypes):
+                    rows_read += len(chunk)
+                    chunk = apply_review_schema(clean_dataframe(chunk, drop_empty_columns=False))
+                    rows_kept += len(chunk)
+                    chunk_matches = int(
+                        chunk["Citation Code: Platform-Specific"].astype(str).str.match(PLATFORM_CITATION_PATTERN).sum()
+                    )
+                    citation_matches += chunk_matches
+                    if len(chunk) and not chunk_matches:
+                        invalid_chunks += 1
+
+                    widened = _arrow_schema_for(chunk, schema)
+                    table = pa.Table.from_pandas(_conform_chunk(chunk, widened), schema=widened, preserve_index=False)
+                    if writer is not None and not widened.equals(schema):
+                        # Rare (e.g. the first text in a numeric column): re-type the rows written so far.
+                        writer.close()
+                        written = pq.read_table(tmp_path).cast(table.schema)
+                        writer = pq.ParquetWriter(tmp_path, table.schema)
+                        writer.write_table(written)
+                        del written
+                    schema = widened
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, table.schema)
+                    writer.write_table(table)
+
+                    if progress_callback is not None:
+                        elapsed = max(time.perf_counter() - started, 1e-9)
+                        progress_callback({
+                            "rows_read": rows_read,
+                            "rows_kept": rows_kept,
+                            "citation_matches": citation_matches,
+                            "invalid_chunks": invalid_chunks,
+                            "rows_per_second": rows_read / elapsed,
+                            "fraction": min(f.tell() / total_bytes, 1.0),
+                        })
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
+            # Header-only file: nothing to snapshot.
+            return None
+
+        os.replace(tmp_path, path)
+        df = read_snapshot(path)
+        df.attrs["citation_matches"] = citation_matches
+        return df
+
+    except Exception as e:
+        print(f"Error loading file: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
 # Required columns based on your description
 REQUIRED_COLUMNS = [
     "Citation Code: Platform-Specific", "Review Title", "Case Study Title", "Judgement", "Title"
@@ -71,8 +325,11 @@ def validate_csv(df):
     # Remove completely empty rows
     df.dropna(how="all", inplace=True)
 
-    # Validate 'Citation Code: Platform-Specific' (must contain platform ID)
-    if not df["Citation Code: Platform-Specific"].astype(str).str.match(r"#289[DMA]").any():
+    # Validate 'Citation Code: Platform-Specific' (must contain platform ID); streamed loads counted it per chunk
+    citation_matches = df.attrs.get("citation_matches")
+    if citation_matches is None:
+        citation_matches = df["Citation Code: Platform-Specific"].astype(str).str.match(PLATFORM_CITATION_PATTERN).any()
+    if not citation_matches:
         st.error("Invalid or missing platform identifiers in 'Citation Code: Platform-Specific'. Expected values: #289D (Desktop), #289M (Mobile), #289A (App).")
         return False
 
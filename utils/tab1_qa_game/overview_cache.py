@@ -0,0 +1,64 @@
+# overview_cache.py
+
+from cachetools import LRUCache
+
+
+def normalize_filters(
+    search_term: str = "",
+    theme_filter: str = "All",
+    case_study_filter: str = "All",
+    platform_filter: list = None,
+    low_cost_filter: bool = False,
+    sort_by_impact: bool = False
+) -> tuple:
+    """
+    Turns the Overview widget values into a hashable key. Values that select the same
+    rows map to the same key (search is case-insensitive, platform order is irrelevant).
+    """
+    return (
+        (search_term or "").strip().lower(),
+        theme_filter,
+        case_study_filter,
+        tuple(sorted(platform_filter or [])),
+        bool(low_cost_filter),
+        bool(sort_by_impact),
+    )
+
+
+class FilterResultCache:
+    """
+    Bounded LRU of Overview results keyed on (dataset hash, normalized filters).
+
+    Each entry holds whatever the Overview derives from one filter combination
+    (the filtered frame and its pills figure), so reruns triggered by unrelated
+    widgets or by navigating back from the detail page skip the recomputation.
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self._entries = LRUCache(maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, dataset_hash: str, filter_key: tuple, compute):
+        """Returns the cached result for the key, calling compute() on a miss."""
+        key = (dataset_hash, filter_key)
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        result = compute()
+        self._entries[key] = result
+        return result
+
+    def invalidate(self) -> None:
+        """Drops every entry (called when a new file is uploaded)."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "maxsize": self._entries.maxsize,
+        }
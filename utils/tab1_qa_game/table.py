@@ -0,0 +1,71 @@
+# table.py
+
+import numpy as np
+import pandas as pd
+from ..helpers import JUDGMENT_COLORS, judgment_color_array
+
+DISPLAY_COLUMNS = {
+    'Citation Code: Platform-Specific': 'Citation',
+    'Case Study Title': 'Site',
+    'Title': 'Title',
+    'Judgement': 'Judgement',
+    'Gemini URL': 'Gemini URL',
+    'Image URLs': 'Image URLs',
+}
+
+# Alternating backgrounds for consecutive citation groups (darker for even, lighter for odd).
+GROUP_BACKGROUNDS = np.array(['#1e1f24', '#2c2d33'], dtype=object)
+JUDGEMENT_CELL_STYLE = '; color: white; font-weight: bold'
+
+# Larger tables are styled and rendered one page at a time.
+PAGE_SIZE = 500
+
+
+def build_display_table(filtered_df: pd.DataFrame) -> pd.DataFrame:
+    """Selects, renames and orders (by citation) the columns shown in the Overview table."""
+    columns = [col for col in DISPLAY_COLUMNS if col in filtered_df.columns]
+    return (
+        filtered_df[columns]
+        .sort_values('Citation Code: Platform-Specific', kind='stable')
+        .rename(columns=DISPLAY_COLUMNS)
+    )
+
+
+def citation_group_parity(citations: pd.Series) -> np.ndarray:
+    """0/1 per row, alternating between consecutive distinct citations (in order of first appearance)."""
+    codes, _ = pd.factorize(citations)
+    return codes % 2
+
+
+def judgement_table_styles(display_df: pd.DataFrame, parity: np.ndarray) -> pd.DataFrame:
+    """
+    CSS for every cell, computed column-wise: each row gets its citation group's
+    background, and the Judgement column gets the judgement's palette color.
+    """
+    row_styles = 'background-color: ' + GROUP_BACKGROUNDS[parity]
+    styles = pd.DataFrame(
+        np.repeat(row_styles[:, None], len(display_df.columns), axis=1),
+        index=display_df.index,
+        columns=display_df.columns
+    )
+    if 'Judgement' in display_df.columns:
+        # Missing judgements are shown like 'not_rated'.
+        colors = judgment_color_array(display_df['Judgement'], missing_color=JUDGMENT_COLORS['not_rated'])
+        styles['Judgement'] = 'background-color: ' + colors + JUDGEMENT_CELL_STYLE
+    return styles
+
+
+def style_judgement_table(display_df: pd.DataFrame, parity: np.ndarray = None):
+    """
+    Returns a Styler for (a page of) the display table. Pass the parity slice computed
+    on the full table so group colors stay consistent across page boundaries.
+    """
+    if parity is None:
+        parity = citation_group_parity(display_df['Citation'])
+    return display_df.style.apply(judgement_table_styles, axis=None, parity=parity)
+
+
+def page_bounds(total_rows: int, page: int, page_size: int = PAGE_SIZE) -> tuple:
+    """(start, stop) row positions of a 1-based page."""
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total_rows)
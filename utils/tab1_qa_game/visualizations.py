@@ -1,12 +1,54 @@
-
 # visualizations.py
 
+import numpy as np
 import plotly.graph_objects as go
-from ..helpers import get_judgment_color
+from ..helpers import judgment_palette, get_judgment_color
+
+# Above this many pills the chart switches to WebGL rendering (Scattergl).
+WEBGL_THRESHOLD = 20_000
+
+# Level of detail: above this many rows the Overview shows one tile per case study x theme
+# instead of one pill per row, and a drilled-down slice never sends more pills than this.
+LOD_THRESHOLD = 50_000
+
+TILE_KEYS = ['Case Study Title', 'Catalog Theme Title']
+
+HOVER_COLUMNS = [
+    ('Citation', 'Citation Code: Platform-Specific'),
+    ('Title', 'Title'),
+    ('Case Study', 'Case Study Title'),
+    ('Judgment', 'Judgement'),
+    ('Theme', 'Catalog Theme Title'),
+    ('Topic', 'Catalog Topic Title'),
+]
+
+
+def _text_column(df, col):
+    """Column as an object array of plain strings ('' for missing), decoding categoricals."""
+    return df[col].astype(object).fillna('').to_numpy()
 
-def create_pills_visualization(input_df, title=""):
-    df = input_df.copy()
-    df = df.loc[df['Judgement'].notna()].reset_index(drop=True)
+
+def discrete_colorscale(palette):
+    """Colorscale that paints integer value i (over cmin=-0.5, cmax=len-0.5) with palette[i]."""
+    if len(palette) == 1:
+        return [[0.0, palette[0]], [1.0, palette[0]]]
+    colorscale = []
+    for i, color in enumerate(palette):
+        colorscale.append([i / len(palette), color])
+        colorscale.append([(i + 1) / len(palette), color])
+    return colorscale
+
+
+def create_pills_visualization(input_df, title="", use_webgl=None):
+    """
+    Builds the one-pill-per-guideline chart.
+
+    Everything is computed column-wise: grid positions from a divmod over the row
+    numbers, colors from the judgement categories' palette codes, and hover text
+    and customdata (citation codes) from whole-column array operations.
+    use_webgl=None picks Scattergl automatically above WEBGL_THRESHOLD pills.
+    """
+    df = input_df.loc[input_df['Judgement'].notna()]
     
     total_pills = len(df)
     pills_per_row = 50  
@@ -16,39 +58,45 @@ def create_pills_visualization(input_df, title=""):
     dot_spacing_x = dot_size * 0.5  
     dot_spacing_y = dot_size * 2    
 
-    # Build hover text for each pill.
-    df['hover_text'] = (
-        'Citation: ' + df['Citation Code: Platform-Specific'].fillna('') + '<br>' +
-        'Title: ' + df['Title'].fillna('') + '<br>' +
-        'Case Study: ' + df['Case Study Title'].fillna('') + '<br>' +
-        'Judgment: ' + df['Judgement'].fillna('') + '<br>' +
-        'Theme: ' + df['Catalog Theme Title'].fillna('') + '<br>' +
-        'Topic: ' + df['Catalog Topic Title'].fillna('')
-    )
+    # Grid coordinates for every pill in one shot.
+    grid_row, grid_col = np.divmod(np.arange(total_pills), pills_per_row)
+    x_positions = grid_col * dot_spacing_x
+    y_positions = -grid_row * dot_spacing_y
 
-    # Precompute arrays for a single trace.
-    x_positions, y_positions, colors, hover_texts, links = [], [], [], [], []
-    for i, (_, row) in enumerate(df.iterrows()):
-        x_positions.append((i % pills_per_row) * dot_spacing_x)
-        y_positions.append(-(i // pills_per_row) * dot_spacing_y)
-        colors.append(get_judgment_color(row['Judgement']))
-        hover_texts.append(row['hover_text'])
-        links.append(row['Citation Code: Platform-Specific'])
-    
-    fig = go.Figure(data=go.Scatter(
+    # Colors are sent as palette indexes over a discrete colorscale rather than one
+    # CSS string per pill, which Plotly would otherwise validate element by element.
+    color_codes, palette = judgment_palette(df['Judgement'])
+    colorscale = discrete_colorscale(palette)
+
+    # Hover strings are concatenated column-wise over object arrays (no per-row Python loop).
+    hover_texts = np.full(total_pills, '', dtype=object)
+    for i, (label, col) in enumerate(HOVER_COLUMNS):
+        hover_texts = hover_texts + (('<br>' if i else '') + f'{label}: ') + _text_column(df, col)
+    links = _text_column(df, 'Citation Code: Platform-Specific')
+
+    if use_webgl is None:
+        use_webgl = total_pills > WEBGL_THRESHOLD
+
+    # The trace is passed as a plain dict so Plotly validates it once, not again on Figure().
+    fig = go.Figure(data=[dict(
+        type='scattergl' if use_webgl else 'scatter',
         x=x_positions,
         y=y_positions,
         mode='markers',
         marker=dict(
             size=dot_size,
-            color=colors,
+            color=color_codes,
+            colorscale=colorscale,
+            cmin=-0.5,
+            cmax=len(palette) - 0.5,
+            showscale=False,
             line=dict(color='black', width=1)
         ),
         text=hover_texts,
         hoverinfo='text',
         customdata=links,  # Each pill carries its linking info
         showlegend=False
-    ))
+    )])
     
     # Update layout to remove padding and enable responsiveness.
     fig.update_layout(
@@ -79,3 +127,98 @@ def create_pills_visualization(input_df, title=""):
         )
     )
     return fig
+
+
+def aggregate_judgement_tiles(df):
+    """
+    Aggregates rows into one tile per (case study, theme) with the judgement distribution.
+    Returns the key columns, one count column per judgement, 'Total' and 'Dominant Judgement'.
+    """
+    counts = (
+        df.loc[df['Judgement'].notna()]
+        .groupby(TILE_KEYS + ['Judgement'], observed=True)
+        .size()
+        .unstack('Judgement', fill_value=0)
+    )
+    counts.columns = [str(col) for col in counts.columns]
+    tiles = counts.reset_index()
+    for col in TILE_KEYS:
+        tiles[col] = tiles[col].astype(str)
+    values = counts.to_numpy()
+    tiles['Total'] = values.sum(axis=1)
+    tiles['Dominant Judgement'] = np.array(counts.columns, dtype=object)[values.argmax(axis=1)] if len(tiles) else []
+    return tiles
+
+
+def create_tiles_visualization(tiles, title=""):
+    """
+    Level-of-detail chart: one square per case study x theme, colored by its dominant
+    judgement and sized by its row count. The payload grows with the number of tiles,
+    not with the number of rows. Clicking a tile is meant to drill down into its pills.
+    """
+    judgement_cols = [col for col in tiles.columns if col not in TILE_KEYS + ['Total', 'Dominant Judgement']]
+
+    hover_texts = (
+        'Case Study: ' + tiles['Case Study Title'].to_numpy(dtype=object) + '<br>' +
+        'Theme: ' + tiles['Catalog Theme Title'].to_numpy(dtype=object) + '<br>' +
+        'Guidelines: ' + tiles['Total'].astype(str).to_numpy(dtype=object)
+    )
+    for col in judgement_cols:
+        hover_texts = hover_texts + f'<br>{col}: ' + tiles[col].astype(str).to_numpy(dtype=object)
+    hover_texts = hover_texts + '<br><i>Click to show these guidelines</i>'
+
+    totals = tiles['Total'].to_numpy()
+    sizes = 12 + 28 * np.sqrt(totals / totals.max()) if len(tiles) else []
+
+    fig = go.Figure(data=[dict(
+        type='scatter',
+        x=tiles['Catalog Theme Title'],
+        y=tiles['Case Study Title'],
+        mode='markers',
+        marker=dict(
+            size=sizes,
+            symbol='square',
+            color=[get_judgment_color(j) for j in tiles['Dominant Judgement']],
+            line=dict(color='black', width=1)
+        ),
+        text=hover_texts,
+        hoverinfo='text',
+        showlegend=False
+    )])
+
+    fig.update_layout(
+        title=title,
+        autosize=True,
+        height=max(300, 40 * tiles['Case Study Title'].nunique()),
+        showlegend=False,
+        plot_bgcolor='rgb(15,17,22)',
+        paper_bgcolor='rgb(15,17,22)',
+        font=dict(color='white'),
+        margin=dict(l=0, r=0, t=0, b=0),
+        xaxis=dict(showgrid=False, zeroline=False, type='category', tickangle=-30),
+        yaxis=dict(showgrid=False, zeroline=False, type='category', autorange='reversed'),
+        clickmode='event+select',
+        hovermode='closest',
+        hoverlabel=dict(
+            bgcolor="white",
+            font=dict(color="black")
+        )
+    )
+    return fig
+
+
+def create_overview_figure(filtered_df, lod_threshold=LOD_THRESHOLD, allow_tiles=True):
+    """
+    Picks the Overview chart for a filtered frame.
+
+    Returns (fig, tiles, pill_rows): above lod_threshold rows (and when allow_tiles)
+    the aggregated tiles chart with its tiles frame and pill_rows=None; otherwise the
+    pills chart with tiles=None and pill_rows holding the rows behind each pill, in
+    point order, capped at lod_threshold.
+    """
+    if allow_tiles and len(filtered_df) > lod_threshold:
+        tiles = aggregate_judgement_tiles(filtered_df)
+        return create_tiles_visualization(tiles), tiles, None
+
+    pill_rows = filtered_df.loc[filtered_df['Judgement'].notna()].iloc[:lod_threshold]
+    return create_pills_visualization(pill_rows, title=""), None, pill_rows
@@ -1,38 +1,156 @@
+import threading
+
 import streamlit as st
-from utils.data_processing import process_datasets  # Import directly
+from cachetools import LRUCache
+from utils.data_processing import get_report_engine  # Import directly
+from utils.schema import DERIVED_COLUMNS
+from utils.tab2_downloads.export import iter_csv_chunks, start_bundle, BUNDLE_FORMATS
+from utils.link_audit import LinkAuditJob
+
+# Prepared downloads, keyed by (dataset hash, report name) and bounded by total bytes.
+# Shared across sessions: the same upload content always yields the same bytes.
+DOWNLOAD_CACHE_BYTES = 256 * 1024 * 1024
+_download_cache = LRUCache(maxsize=DOWNLOAD_CACHE_BYTES, getsizeof=lambda entry: len(entry[0]))
+_download_cache_lock = threading.Lock()
+
+
+def _prepared_download(dataset_hash, key, build_report):
+    """Returns (csv_bytes, row_count) for a report, building and caching it on first request."""
+    cache_key = (dataset_hash, key)
+    with _download_cache_lock:
+        entry = _download_cache.get(cache_key)
+    if entry is None:
+        report = build_report()
+        entry = (b"".join(iter_csv_chunks(report)), len(report))
+        with _download_cache_lock:
+            try:
+                _download_cache[cache_key] = entry
+            except ValueError:
+                pass  # Larger than the whole cache: serve it without keeping it.
+    return entry
+
+
+def _lazy_download_button(dataset_hash, key, label, build_report, file_name):
+    """
+    Renders a report's download without computing it: a "Prepare" button builds the
+    report and its CSV on demand, after which the real download button is shown.
+    """
+    with _download_cache_lock:
+        prepared = (dataset_hash, key) in _download_cache
+    if not prepared and not st.button(f"Prepare {label}", key=f"prepare_{key}"):
+        return
+
+    with st.spinner(f"Preparing {label}..."):
+        data, row_count = _prepared_download(dataset_hash, key, build_report)
+    st.caption(f"Contains {row_count} guidelines")
+    st.download_button(f"Download {label} (CSV)", data, file_name, "text/csv", key=f"download_{key}")
+
+
+def _bundle_download(engine, dataset_hash):
+    """One-click export of every report into a single archive, written on a background thread."""
+    st.header("All Reports")
+    fmt = st.selectbox(
+        "Bundle format",
+        list(BUNDLE_FORMATS),
+        format_func=lambda key: BUNDLE_FORMATS[key][0],
+        key="bundle_format"
+    )
+    label, mime, extension = BUNDLE_FORMATS[fmt]
+
+    jobs = st.session_state.setdefault("bundle_jobs", {})
+    job = jobs.get((dataset_hash, fmt))
+    if job is None:
+        if st.button("Build bundle", key="build_bundle"):
+            jobs[(dataset_hash, fmt)] = start_bundle(engine, fmt)
+            st.rerun()
+    elif not job.done():
+        st.info(f"Building {label}... you can keep using the app meanwhile.")
+        if st.button("Check again", key="refresh_bundle"):
+            st.rerun()
+    elif job.exception() is not None:
+        st.error(f"Could not build the bundle: {job.exception()}")
+        if st.button("Try again", key="retry_bundle"):
+            del jobs[(dataset_hash, fmt)]
+            st.rerun()
+    else:
+        spool = job.result()
+        spool.seek(0)
+        st.download_button(
+            f"Download all reports ({label})",
+            spool.read(),
+            f"qa_reports.{extension}",
+            mime,
+            key="download_bundle"
+        )
+
+
+def _link_audit_download(df, dataset_hash):
+    """Broken Screenshots: checks every screenshot and Gemini link in the background, then offers the report."""
+    st.subheader("Broken Screenshots")
+    st.caption("Checks every 'Image URLs' and 'Gemini URL' link and lists the ones that fail or are not images.")
+
+    jobs = st.session_state.setdefault("link_audit_jobs", {})
+    job = jobs.get(dataset_hash)
+    if job is None:
+        if st.button("Check links", key="start_link_audit"):
+            jobs[dataset_hash] = LinkAuditJob(df)
+            st.rerun()
+    elif not job.future.done():
+        fraction = job.checked / job.total if job.total else 0.0
+        st.progress(fraction, text=f"Checked {job.checked:,} of {job.total:,} links...")
+        if st.button("Check again", key="refresh_link_audit"):
+            st.rerun()
+    elif job.future.exception() is not None:
+        st.error(f"Could not check the links: {job.future.exception()}")
+        if st.button("Try again", key="retry_link_audit"):
+            del jobs[dataset_hash]
+            st.rerun()
+    else:
+        report = job.future.result()
+        st.caption(f"Contains {len(report)} broken links")
+        st.download_button(
+            "Download Broken Screenshots (CSV)", b"".join(iter_csv_chunks(report)), "broken_screenshots.csv",
+            "text/csv", key="download_broken_screenshots"
+        )
+
 
 def display_download_options():
     """Displays download options for complete and filtered datasets in Streamlit."""
-    
+
     st.title("Download Options")
-    
+
     if "df" in st.session_state and st.session_state.df is not None:
-        # Process the datasets
-        processed_dfs = process_datasets(st.session_state.df)
-        
+        df = st.session_state.df
+        dataset_hash = st.session_state.get("dataset_hash")
+        # Reports are only listed here; each one is built when its download is requested.
+        engine = get_report_engine(df)
+
+        _bundle_download(engine, dataset_hash)
+        st.markdown("---")
+
         # --- Complete Dataset Download ---
         st.header("Complete Dataset")
-        st.download_button(
-            "Download Complete Dataset (CSV)",
-            st.session_state.df.to_csv(index=False),
-            "complete_guidelines_dataset.csv",
-            "text/csv"
+        _lazy_download_button(
+            dataset_hash,
+            "complete",
+            "Complete Dataset",
+            lambda: df.drop(columns=DERIVED_COLUMNS, errors="ignore"),
+            "complete_guidelines_dataset.csv"
         )
         st.markdown("---")  # Horizontal separator
-        
+
         # --- Filtered Datasets Download ---
-        for name, filtered_df in processed_dfs.items():
-            # Count the number of guidelines that have a non-empty Citation Code for platform-specific guidelines.
-            filtered_guidelines_count = len(filtered_df)
-            
+        for name in engine.report_names():
             st.subheader(name)
-            st.caption(f"Contains {filtered_guidelines_count} guidelines")
-            st.download_button(
-                f"Download {name} (CSV)",
-                filtered_df.to_csv(index=False),
-                f"{name.lower().replace(' ', '_')}.csv",
-                "text/csv"
+            _lazy_download_button(
+                dataset_hash,
+                name,
+                name,
+                lambda name=name: engine.build(name),
+                f"{name.lower().replace(' ', '_')}.csv"
             )
             st.markdown("---")  # Separator between each filtered dataset download option
+
+        _link_audit_download(df, dataset_hash)
     else:
         st.info("Please upload a CSV file first to enable downloads.")
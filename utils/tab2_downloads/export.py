@@ -0,0 +1,116 @@
+import importlib.util
+import io
+import json
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows serialized per CSV chunk, so only one chunk's text is held at a time.
+CSV_CHUNK_ROWS = 50_000
+
+# Bundles stay in memory up to this size, then spill to a temporary file on disk.
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+# Excel needs an optional writer engine; the XLSX format is only offered when one is installed.
+XLSX_ENGINE = next(
+    (engine for engine in ("xlsxwriter", "openpyxl") if importlib.util.find_spec(engine) is not None),
+    None
+)
+EXCEL_MAX_ROWS = 1_048_575  # sheet limit, minus the header row
+
+BUNDLE_FORMATS = {
+    "zip": ("ZIP of CSV files", "application/zip", "zip"),
+    "parquet": ("Parquet dataset (ZIP)", "application/zip", "zip"),
+}
+if XLSX_ENGINE is not None:
+    BUNDLE_FORMATS["xlsx"] = (
+        "Excel workbook (one sheet per report)",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "xlsx"
+    )
+
+# Bundles are written off the Streamlit script thread so the UI keeps responding.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-bundle")
+
+
+def iter_csv_chunks(df, chunk_rows=CSV_CHUNK_ROWS):
+    """Yields the frame's CSV encoding (header first) as UTF-8 bytes, chunk_rows rows at a time."""
+    if df.empty:
+        yield df.to_csv(index=False).encode()
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode()
+
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def _flatten_nested(df):
+    """Serializes list/dict cells (e.g. the 'Judgements' records) as JSON text for typed formats."""
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        if df[col].map(lambda v: isinstance(v, (list, dict))).any():
+            df[col] = df[col].map(lambda v: json.dumps(v, default=str) if isinstance(v, (list, dict)) else v)
+    return df
+
+
+def _write_zip_of_csvs(spool, reports):
+    with zipfile.ZipFile(spool, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, build in reports:
+            with archive.open(f"{_slug(name)}.csv", "w") as member:
+                for chunk in iter_csv_chunks(build()):
+                    member.write(chunk)
+
+
+def _write_parquet_dataset(spool, reports):
+    with zipfile.ZipFile(spool, "w", zipfile.ZIP_STORED) as archive:  # Parquet is already compressed
+        for name, build in reports:
+            buffer = io.BytesIO()
+            table = pa.Table.from_pandas(_flatten_nested(build()), preserve_index=False)
+            pq.write_table(table, buffer, compression="zstd")
+            archive.writestr(f"{_slug(name)}.parquet", buffer.getvalue())
+
+
+def _write_xlsx(spool, reports):
+    used_names = set()
+    with pd.ExcelWriter(spool, engine=XLSX_ENGINE) as writer:
+        for name, build in reports:
+            sheet = name[:31]  # Excel's sheet-name limit
+            while sheet in used_names:
+                sheet = f"{sheet[:28]}_{len(used_names)}"
+            used_names.add(sheet)
+            df = _flatten_nested(build())
+            df.head(EXCEL_MAX_ROWS).to_excel(writer, sheet_name=sheet, index=False)
+
+
+_WRITERS = {
+    "zip": _write_zip_of_csvs,
+    "parquet": _write_parquet_dataset,
+    "xlsx": _write_xlsx,
+}
+
+
+def write_bundle(reports, fmt):
+    """
+    Writes every report into one archive and returns it as a SpooledTemporaryFile
+    positioned at the start.
+
+    `reports` is a list of (name, build) pairs; each report is built, written and
+    released in turn, so only one report is in memory at a time.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    _WRITERS[fmt](spool, reports)
+    spool.seek(0)
+    return spool
+
+
+def start_bundle(engine, fmt):
+    """Starts writing a bundle of all of the engine's reports on the background pool; returns the Future."""
+    reports = [(name, lambda name=name: engine.build(name)) for name in engine.report_names()]
+    return _executor.submit(write_bundle, reports, fmt)
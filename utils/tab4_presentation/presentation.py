@@ -1,55 +1,37 @@
 import streamlit as st
 import pandas as pd
-from utils.data_processing import compute_overall_statistics
-from utils.agent.tools import get_dataset_info, rank_case_studies_by_impact
+from utils.impact_cube import ImpactCube, get_impact_cube
 import plotly.express as px
 import plotly.graph_objects as go
 
 
-def extract_platform_column(df: pd.DataFrame):
-    """Extracts a 'platform' column from 'Citation Code: Platform-Specific'."""
-    if "Citation Code: Platform-Specific" in df.columns:
-        df = df.copy()
-        df["platform"] = df["Citation Code: Platform-Specific"].astype(str).str.strip().str[-1].map({
-            "D": "Desktop",
-            "M": "Mobile",
-            "A": "App"
-        })
-    return df
+def overall_statistics(cube: ImpactCube) -> pd.DataFrame:
+    """Total guidelines and their split by platform (same layout as compute_overall_statistics)."""
+    counts = cube.rollup(["platform"]).set_index("platform")["rows"] if "platform" in cube.dimensions else {}
+    return pd.DataFrame({
+        "Total Guidelines": [cube.n_rows],
+        **{platform: [int(counts.get(platform, 0))] for platform in ["Desktop", "Mobile", "App"]}
+    })
 
 
-def filter_performance_by_platform(df: pd.DataFrame):
-    """Filter and compute performance statistics by platform."""
-    df = extract_platform_column(df)
-    dataset_info = get_dataset_info(df)
-    platforms = dataset_info["platforms"]
-    
-    if "Impact" not in df.columns or "platform" not in df.columns:
+def filter_performance_by_platform(cube: ImpactCube):
+    """Average impact per platform."""
+    if "platform" not in cube.dimensions:
         return pd.DataFrame({"Error": ["Required columns ('Impact', 'platform') not found in dataset"]})
-    
-    # Ensure we filter the dataset based on extracted platforms
-    df_filtered = df[df["platform"].isin(platforms)]
-    
-    if df_filtered.empty:
+
+    performance_df = cube.rollup(["platform"])
+    if performance_df.empty:
         return pd.DataFrame({"Error": ["No matching data for extracted platforms"]})
-    
-    performance_df = df_filtered.groupby("platform")["Impact"].mean().reset_index()
-    return performance_df
+    return performance_df[["platform", "mean"]].rename(columns={"mean": "Impact"})
 
 
 
-def visualize_case_study_performance(df: pd.DataFrame):
+def visualize_case_study_performance(cube: ImpactCube, platform: str = None):
     """Create an interactive visualization of performance by case study and platform using Plotly."""
-    # Convert Impact to numeric and create a copy to avoid modifying original
-    df = df.copy()
-    df['Impact'] = pd.to_numeric(df['Impact'], errors='coerce')
-    
-    # Calculate average impact and count in one step
-    avg_impact = (df.groupby(['Case Study Title', 'platform'])
-                 .agg({'Impact': ['mean', 'size']})
-                 .reset_index())
-    
-    # Flatten column names
+    # Average impact and guideline count per case study and platform, rolled up from the cube
+    where = {"platform": platform} if platform else None
+    avg_impact = cube.rollup(['Case Study Title', 'platform'], where=where)
+    avg_impact = avg_impact[['Case Study Title', 'platform', 'mean', 'rows']]
     avg_impact.columns = ['Case Study Title', 'platform', 'avg_impact', 'count']
     
     # Create the scatter plot
@@ -88,14 +70,13 @@ def visualize_case_study_performance(df: pd.DataFrame):
 
 
 
-def rank_case_studies_by_impact(df: pd.DataFrame) -> pd.DataFrame:
-    """Rank case studies by their average impact score."""
-    return (df.groupby('Case Study Title')
-            .agg({
-                'Impact': ['mean', 'size', 'std']
-            })
-            .round(2)
-            .reset_index())
+def rank_case_studies_by_impact(cube: ImpactCube, platform: str = None) -> pd.DataFrame:
+    """Case studies by average impact (highest first), with guideline count and standard deviation."""
+    where = {"platform": platform} if platform else None
+    stats = cube.rollup(['Case Study Title'], where=where).set_index('Case Study Title')
+    stats = stats[['mean', 'rows', 'std']].round(2)
+    stats.columns = ['Average Impact', 'Number of Guidelines', 'Std Dev']
+    return stats.sort_values('Average Impact', ascending=False)
 
 
 
@@ -154,55 +135,31 @@ def presentation_tab_4(df: pd.DataFrame):
     """Streamlit UI for Tab 4 - Performance Analysis with interactive visualizations."""
     st.title("Tab 4: Performance Analysis")
     
-    # ✅ Ensure platform data exists
-    df = extract_platform_column(df)
-    df = df.copy()
-    df['Impact'] = pd.to_numeric(df['Impact'], errors='coerce')
-
-    # ✅ Debug: Check Impact values
-    st.write("🔍 Checking Impact values before aggregation:")
-    st.write(df[['Case Study Title', 'platform', 'Impact', "Title"]].dropna().head(10))
+    # ✅ Every chart and table below is a roll-up of the impact cube, built once per dataset
+    cube = get_impact_cube(df)
 
     # ✅ 1. Overview Statistics
     with st.expander("1. Overview - General Statistics", expanded=True):
-        st.write(compute_overall_statistics(df))
+        st.write(overall_statistics(cube))
     
     # ✅ 2. Overall Performance
     with st.expander("2. Performance Overall - Visualization & Data", expanded=True):
         st.subheader("Performance Visualization")
-        fig = visualize_case_study_performance(df)
+        fig = visualize_case_study_performance(cube)
         st.plotly_chart(fig, use_container_width=True)
         
         st.subheader("Performance Data")
-        summary_stats = (df.groupby('Case Study Title')
-                        .agg({'Impact': ['mean', 'size', 'std']})
-                        .round(2))
-        summary_stats.columns = ['Average Impact', 'Number of Guidelines', 'Std Dev']
-        summary_stats = summary_stats.sort_values('Average Impact', ascending=False)
-        st.dataframe(summary_stats, use_container_width=True)
+        st.dataframe(rank_case_studies_by_impact(cube), use_container_width=True)
 
     # ✅ 3. Platform-specific Analysis
-    dataset_info = get_dataset_info(df)
-    st.write("🔍 Platforms extracted from dataset:", dataset_info["platforms"])  # Debug platforms
-
-    for platform in dataset_info["platforms"]:
+    for platform in cube.platforms():
         with st.expander(f"3. {platform} Performance - Visualization & Data"):
-            platform_df = df[df["platform"] == platform]
-
-            if not platform_df.empty:
-                st.subheader(f"{platform} Performance Visualization")
-                fig = visualize_case_study_performance(platform_df)
-                st.plotly_chart(fig, use_container_width=True)
-                
-                st.subheader(f"{platform} Performance Data")
-                platform_stats = (platform_df.groupby('Case Study Title')
-                                .agg({'Impact': ['mean', 'size', 'std']})
-                                .round(2))
-                platform_stats.columns = ['Average Impact', 'Number of Guidelines', 'Std Dev']
-                platform_stats = platform_stats.sort_values('Average Impact', ascending=False)
-                st.dataframe(platform_stats, use_container_width=True)
-            else:
-                st.error(f"No data available for {platform}.")
+            st.subheader(f"{platform} Performance Visualization")
+            fig = visualize_case_study_performance(cube, platform)
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.subheader(f"{platform} Performance Data")
+            st.dataframe(rank_case_studies_by_impact(cube, platform), use_container_width=True)
 
 
 